@@ -0,0 +1,175 @@
+# Almanac: rise, transit, set and maximum altitude for the Sun, Moon, planets and catalog stars
+#
+#   python almanac_utils.py --lat 53.55 --lon 9.99 --date 2025-06-05 --days 3
+#
+# Days are UTC days. Stars use the closed-form hour-angle solution on their apparent
+# RA/Dec of date, all stars of a day in one vectorized pass. Solar-system bodies move too
+# much for that: their altitude track is sampled from the planet_utils tables and the
+# horizon and meridian crossings are refined by vectorized bisection. max_altitude is the
+# altitude at upper transit.
+# Results are cached per (site, date, magnitude limit).
+import argparse
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from astro_utils import SOLAR_SYSTEM_BODIES, get_timescale, load_ephemeris, star_set
+
+# Altitude of the upper limb at rising/setting, with standard refraction (degrees)
+STAR_HORIZON = -0.5667
+BODY_HORIZONS = {'Sun': -0.8333, 'Moon': -0.8333}
+SIDEREAL_RATE = 1.00273790935  # sidereal hours per solar hour
+TRACK_STEP_MINUTES = 10
+BISECTION_STEPS = 16  # 10 minutes / 2**16, well below a second
+ALMANAC_CACHE_SIZE = 64
+ALMANAC_COLUMNS = ['date', 'name', 'type', 'hip', 'rise', 'transit', 'set', 'max_altitude', 'status']
+
+_almanacs = OrderedDict()
+
+
+def _status(always_up, never_up):
+    return np.where(always_up, 'always up', np.where(never_up, 'never rises', 'rises and sets'))
+
+
+def _hours_to_times(day_start, hours):
+    return (pd.Timestamp(day_start) + pd.to_timedelta(hours, unit='h')).round('s')
+
+
+# Closed-form almanac for every star brighter than mag_limit on one UTC day
+def star_almanac(lat, lon, day, mag_limit=2.0):
+    stars, star = star_set(mag_limit)
+    ts = get_timescale()
+    day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    t0 = ts.from_datetime(day_start)
+    # RA/Dec of date at midday; stars move far too little within a day to matter
+    ra, dec, _ = load_ephemeris()['earth'].at(ts.from_datetime(day_start + timedelta(hours=12))) \
+        .observe(star).apparent().radec(epoch='date')
+    ra_h, dec_r = ra.hours, dec.radians
+    phi = np.radians(lat)
+    last0 = (t0.gast + lon / 15.0) % 24.0
+    cos_h0 = (np.sin(np.radians(STAR_HORIZON)) - np.sin(phi) * np.sin(dec_r)) / (np.cos(phi) * np.cos(dec_r))
+    always_up, never_up = cos_h0 < -1, cos_h0 > 1
+    h0 = np.degrees(np.arccos(np.clip(cos_h0, -1, 1))) / 15.0  # semi-diurnal arc, sidereal hours
+    rises_and_sets = ~(always_up | never_up)
+    transit = ((ra_h - last0) % 24.0) / SIDEREAL_RATE
+    rise = np.where(rises_and_sets, ((ra_h - h0 - last0) % 24.0) / SIDEREAL_RATE, np.nan)
+    set_ = np.where(rises_and_sets, ((ra_h + h0 - last0) % 24.0) / SIDEREAL_RATE, np.nan)
+    return pd.DataFrame({
+        'date': day,
+        'name': [f"HIP {hip}" for hip in stars.index],
+        'type': 'Star',
+        'hip': stars.index.values,
+        'rise': _hours_to_times(day_start, rise),
+        'transit': _hours_to_times(day_start, np.where(never_up, np.nan, transit)),
+        'set': _hours_to_times(day_start, set_),
+        'max_altitude': np.round(90.0 - np.abs(lat - np.degrees(dec_r)), 2),
+        'status': _status(always_up, never_up),
+    })
+
+
+# Bisection on the sign of f(x) for many brackets at once; f maps an array of x (one per
+# bracket) to values whose sign change is bracketed by lo, hi
+def bisect_roots(f, lo, hi, steps=BISECTION_STEPS):
+    f_lo = f(lo)
+    for _ in range(steps):
+        mid = (lo + hi) / 2
+        f_mid = f(mid)
+        left = np.sign(f_mid) == np.sign(f_lo)
+        lo, f_lo = np.where(left, mid, lo), np.where(left, f_mid, f_lo)
+        hi = np.where(left, hi, mid)
+    return (lo + hi) / 2
+
+
+# Root-finding almanac for the Sun, Moon and planets on one UTC day
+def body_almanac(lat, lon, day):
+    from planet_utils import BODY_NAMES, planet_altaz_table
+    ts = get_timescale()
+    day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    t0 = ts.from_datetime(day_start)
+    horizons = np.array([BODY_HORIZONS.get(name, STAR_HORIZON) for name in BODY_NAMES])
+
+    def altaz(hours):
+        # (altitude[i], azimuth[i]) of body i at hours[i]
+        alt, az = planet_altaz_table(lat, lon, ts.tt_jd(t0.tt + np.atleast_1d(hours) / 24.0))
+        diagonal = np.arange(len(BODY_NAMES))
+        return alt[diagonal, diagonal], az[diagonal, diagonal]
+
+    grid = np.arange(0, 24 + TRACK_STEP_MINUTES / 60, TRACK_STEP_MINUTES / 60)
+    step = grid[1] - grid[0]
+    track_alt, track_az = planet_altaz_table(lat, lon, ts.tt_jd(t0.tt + grid / 24.0))
+    above = track_alt > horizons[:, None]
+    # Upper transit: hour angle goes from negative to positive, i.e. sin(azimuth) from + to -
+    east = np.sin(np.radians(track_az)) > 0
+    crossings = {
+        'rise': (~above[:, :-1] & above[:, 1:], lambda h: altaz(h)[0] - horizons),
+        'set': (above[:, :-1] & ~above[:, 1:], lambda h: altaz(h)[0] - horizons),
+        'transit': (east[:, :-1] & ~east[:, 1:], lambda h: np.sin(np.radians(altaz(h)[1]))),
+    }
+    results = {}
+    for kind, (crossing, f) in crossings.items():
+        has = crossing.any(axis=1)
+        first = grid[crossing.argmax(axis=1)]
+        results[kind] = np.where(has, bisect_roots(f, first, first + step), np.nan)
+    max_altitude = altaz(np.nan_to_num(results['transit']))[0]
+    never_up, always_up = ~above.any(axis=1), above.all(axis=1)
+    return pd.DataFrame({
+        'date': day,
+        'name': list(BODY_NAMES),
+        'type': [SOLAR_SYSTEM_BODIES[name][1] for name in BODY_NAMES],
+        'hip': 0,
+        'rise': _hours_to_times(day_start, results['rise']),
+        'transit': _hours_to_times(day_start, np.where(never_up, np.nan, results['transit'])),
+        'set': _hours_to_times(day_start, results['set']),
+        'max_altitude': np.where(np.isnan(results['transit']), np.nan, np.round(max_altitude, 2)),
+        'status': _status(always_up, never_up),
+    })
+
+
+# Almanac of all bodies and stars for one site and UTC day, cached
+def almanac_for_date(lat, lon, day, mag_limit=2.0):
+    key = (round(lat, 4), round(lon, 4), day, mag_limit)
+    if key in _almanacs:
+        _almanacs.move_to_end(key)
+        return _almanacs[key]
+    table = pd.concat([body_almanac(lat, lon, day), star_almanac(lat, lon, day, mag_limit)], ignore_index=True)
+    _almanacs[key] = table[ALMANAC_COLUMNS]
+    if len(_almanacs) > ALMANAC_CACHE_SIZE:
+        _almanacs.popitem(last=False)
+    return _almanacs[key]
+
+
+# Dashboard/export columns for one almanac row (a dict, or None when the object has none)
+def almanac_fields(row):
+    if row is None:
+        return {'Rises (UTC)': None, 'Transit (UTC)': None, 'Sets (UTC)': None, 'Max altitude (°)': None}
+    no_event = row['status'] if row['status'] != 'rises and sets' else None
+
+    def clock(t):
+        return no_event if pd.isna(t) else t.strftime('%H:%M')
+    return {'Rises (UTC)': clock(row['rise']), 'Transit (UTC)': clock(row['transit']),
+            'Sets (UTC)': clock(row['set']), 'Max altitude (°)': row['max_altitude']}
+
+
+def compute_almanac(lat, lon, start_date=None, days=1, mag_limit=2.0):
+    start_date = start_date or datetime.now(timezone.utc).date()
+    return pd.concat([almanac_for_date(lat, lon, start_date + timedelta(days=i), mag_limit)
+                      for i in range(days)], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rise, transit and set times (UTC) for one site")
+    parser.add_argument('--lat', type=float, default=53.55)
+    parser.add_argument('--lon', type=float, default=9.99)
+    parser.add_argument('--date', type=date.fromisoformat, default=None, help='first UTC day, YYYY-MM-DD')
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--mag-limit', type=float, default=2.0)
+    args = parser.parse_args()
+    table = compute_almanac(args.lat, args.lon, args.date, args.days, args.mag_limit)
+    with pd.option_context('display.max_rows', 60, 'display.width', 140):
+        print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# Headless JSON/PNG HTTP API for Merai
+#
+#   python api_server.py --port 8080 --workers 4
+#
+#   GET /health
+#   GET /visible?lat=53.55&lon=9.99[&time=2025-06-05T22:30]   -> JSON list of visible objects
+#   GET /object?name=Mars%20(planet)                          -> JSON description + image url
+#   GET /chart.png?lat=53.55&lon=9.99[&time=...][&projection=stereographic] -> PNG sky chart
+#
+# The astronomy runs in a process pool so the event loop stays responsive, and identical
+# requests that arrive while one is already being computed share that single computation.
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import json
+import os
+from urllib.parse import urlsplit, parse_qs
+
+MAX_HEADER_BYTES = 16 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+# --- Work done in the pool (top-level so it can be pickled) ---
+# No Wikipedia lookups in the pool: stars without a catalog name stay "Common Name: None",
+# clients ask /object?name=HIP n for the description
+def compute_visible(lat, lon, iso_time):
+    from astro_utils import get_visible_objects
+    return get_visible_objects(lat, lon, datetime.fromisoformat(iso_time), describe=False)
+
+
+def compute_chart(objects, lat, lon, iso_time, projection='rectangular'):
+    from visualization import render_sky_chart
+    return render_sky_chart(objects, site=(lat, lon, datetime.fromisoformat(iso_time)), projection=projection)
+
+
+def fetch_object_details(name):
+    from wiki_utils import get_object_description, get_object_image_url
+    return {'name': name, 'description': get_object_description(name), 'image_url': get_object_image_url(name)}
+
+
+# --- Request parsing ---
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _float_param(params, name, low, high):
+    try:
+        value = float(params[name][0])
+    except (KeyError, ValueError):
+        raise ApiError(400, f"query parameter '{name}' must be a number")
+    if not low <= value <= high:
+        raise ApiError(400, f"'{name}' must be between {low} and {high}")
+    return value
+
+
+# Observation time as an ISO string. "now" is truncated to the minute, so that concurrent
+# requests without an explicit time can be coalesced.
+def _time_param(params):
+    if 'time' not in params:
+        return datetime.now(timezone.utc).replace(second=0, microsecond=0).isoformat()
+    try:
+        dt = datetime.fromisoformat(params['time'][0])
+    except ValueError:
+        raise ApiError(400, "'time' must be ISO 8601, e.g. 2025-06-05T22:30")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)  # same convention as get_user_datetime()
+    return dt.isoformat()
+
+
+def _projection_param(params):
+    from projection_utils import PROJECTIONS
+    projection = params.get('projection', ['rectangular'])[0]
+    if projection not in PROJECTIONS:
+        raise ApiError(400, f"'projection' must be one of {', '.join(PROJECTIONS)}")
+    return projection
+
+
+def _site_params(params):
+    return (round(_float_param(params, 'lat', -90, 90), 4),
+            round(_float_param(params, 'lon', -180, 180), 4),
+            _time_param(params))
+
+
+class SkyApi:
+    def __init__(self, workers=None):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.inflight = {}
+        self.stats = {'requests': 0, 'computed': 0, 'coalesced': 0}
+
+    # Run fn(*args) in the pool, or join the identical computation that is already running
+    async def coalesced(self, key, fn, *args):
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, fn, *args)
+        self.inflight[key] = future
+        self.stats['computed'] += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    async def visible(self, params):
+        site = _site_params(params)
+        return await self.coalesced(('visible',) + site, compute_visible, *site)
+
+    async def route(self, method, target):
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        if method != 'GET':
+            raise ApiError(405, 'only GET is supported')
+        if url.path == '/health':
+            return 200, 'application/json', {'status': 'ok', **self.stats}
+        if url.path == '/visible':
+            return 200, 'application/json', await self.visible(params)
+        if url.path == '/chart.png':
+            projection = _projection_param(params)
+            objects = await self.visible(params)
+            site = _site_params(params)
+            return 200, 'image/png', await self.coalesced(('chart', projection) + site, compute_chart, objects,
+                                                          *site, projection)
+        if url.path == '/object':
+            if not params.get('name'):
+                raise ApiError(400, "query parameter 'name' is required")
+            name = params['name'][0]
+            return 200, 'application/json', await self.coalesced(('object', name), fetch_object_details, name)
+        raise ApiError(404, f"no endpoint {url.path}")
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            self.stats['requests'] += 1
+            method, target, _ = head.decode('latin-1').split('\r\n', 1)[0].split(' ', 2)
+            try:
+                status, content_type, body = await self.route(method, target)
+            except ApiError as e:
+                status, content_type, body = e.status, 'application/json', {'error': str(e)}
+            except Exception as e:
+                status, content_type, body = 500, 'application/json', {'error': f"{type(e).__name__}: {e}"}
+            if content_type == 'application/json':
+                body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            header = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                      f"Content-Type: {content_type}\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: close\r\n\r\n")
+            writer.write(header.encode('latin-1') + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        print(f"[INFO] Merai API listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Merai sky visibility as a JSON/PNG HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='astronomy worker processes')
+    args = parser.parse_args()
+    api = SkyApi(args.workers)
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# Astronomy-related utilities
+# This is the compute core: it loads skyfield, pandas and the star catalog but nothing
+# from the UI side (streamlit, pydeck, matplotlib), so scripts can import it cheaply.
+import re
+
+from skyfield.api import load, Topos, Star
+import pandas as pd
+
+from catalog_utils import (COMPACT_CATALOG, HIPPARCOS_EPOCH, load_compact_catalog, load_star_catalog,
+                           magnitude_prefix)
+from profiling_utils import span
+from wiki_utils import get_object_description
+
+EPHEMERIS_FILE = 'de421.bsp'
+
+# Canonical solar-system bodies: display name -> (ephemeris key, object type)
+SOLAR_SYSTEM_BODIES = {
+    'Sun': ('sun', 'Sun'),
+    'Moon': ('moon', 'Moon'),
+    'Mercury': ('mercury', 'Planet'),
+    'Venus': ('venus', 'Planet'),
+    'Mars': ('mars', 'Planet'),
+    'Jupiter': ('jupiter barycenter', 'Planet'),
+    'Saturn': ('saturn barycenter', 'Planet'),
+    'Uranus': ('uranus barycenter', 'Planet'),
+    'Neptune': ('neptune barycenter', 'Planet'),
+    'Pluto': ('pluto barycenter', 'Planet'),
+}
+
+_ephemerides = {}
+_timescale = None
+_star_sets = {}
+
+
+def load_ephemeris(path=EPHEMERIS_FILE):
+    if path not in _ephemerides:
+        _ephemerides[path] = load(path)
+    return _ephemerides[path]
+
+
+def get_timescale():
+    global _timescale
+    if _timescale is None:
+        _timescale = load.timescale()
+    return _timescale
+
+
+def observation_time(user_dt=None):
+    ts = get_timescale()
+    return ts.from_datetime(user_dt) if user_dt else ts.now()
+
+
+# Catalog rows brighter than mag_limit plus the matching vectorized skyfield Star,
+# built once per process and limit. With MERAI_COMPACT_CATALOG=1 the rows are only
+# (hip -> magnitude) taken from the shared float32 catalog, and hip_main.dat is never parsed.
+def star_set(mag_limit=None):
+    if mag_limit not in _star_sets:
+        if COMPACT_CATALOG:
+            _star_sets[mag_limit] = _compact_star_set(mag_limit)
+        else:
+            stars = load_star_catalog()
+            if mag_limit is not None:
+                stars = stars[stars['magnitude'] < mag_limit]
+            _star_sets[mag_limit] = (stars, Star.from_dataframe(stars))
+    return _star_sets[mag_limit]
+
+
+def _compact_star_set(mag_limit):
+    catalog = load_compact_catalog()
+    n = magnitude_prefix(catalog, mag_limit)
+    stars = pd.DataFrame({'magnitude': catalog['magnitude'][:n]}, index=pd.Index(catalog['hip'][:n], name='hip'))
+    star = Star(ra_hours=catalog['ra_hours'][:n].astype(float),
+                dec_degrees=catalog['dec_degrees'][:n].astype(float),
+                ra_mas_per_year=catalog['ra_mas_per_year'][:n].astype(float),
+                dec_mas_per_year=catalog['dec_mas_per_year'][:n].astype(float),
+                epoch=HIPPARCOS_EPOCH)
+    return stars, star
+
+
+def _star_altaz(observer_at, mag_limit):
+    stars, star = star_set(mag_limit)
+    alt, az, _ = observer_at.observe(star).apparent().altaz()
+    return pd.DataFrame({
+        'hip': stars.index.values,
+        'magnitude': stars['magnitude'].values,
+        'altitude': alt.degrees,
+        'azimuth': az.degrees,
+    })
+
+
+# (name, type, altitude, azimuth) in degrees for every body in SOLAR_SYSTEM_BODIES, from a
+# full observe().apparent() each. The app uses the faster planet_utils tables, this is the
+# reference they are validated against.
+def get_planet_altaz(observer_at):
+    eph = load_ephemeris()
+    positions = []
+    for name, (key, obj_type) in SOLAR_SYSTEM_BODIES.items():
+        alt, az, _ = observer_at.observe(eph[key]).apparent().altaz()
+        positions.append((name, obj_type, alt.degrees, az.degrees))
+    return positions
+
+
+# Altitude/azimuth of every catalog star (or every star brighter than mag_limit) in one
+# vectorized skyfield call. Stars below the horizon are kept, callers filter on altitude.
+# backend='process' shards the catalog over a process pool (see parallel_utils).
+def get_star_altaz(lat, lon, user_dt=None, mag_limit=None, backend=None):
+    from parallel_utils import DEFAULT_BACKEND, star_altaz_table
+    t = observation_time(user_dt)
+    if (backend or DEFAULT_BACKEND) == 'process':
+        table = star_altaz_table(lat, lon, t, mag_limit, 'process')
+        return pd.DataFrame({
+            'hip': table['hip'],
+            'magnitude': table['magnitude'],
+            'altitude': table['altitude'][0],
+            'azimuth': table['azimuth'][0],
+        })
+    observer = load_ephemeris()['earth'] + Topos(latitude_degrees=lat, longitude_degrees=lon)
+    return _star_altaz(observer.at(t), mag_limit)
+
+
+# Plain visibility list for scripted use: no Wikipedia naming, stars named "HIP n" and
+# carrying their integer hip id (0 for solar-system bodies) and magnitude
+def compute_visibility(lat, lon, user_dt=None, mag_limit=2.0, min_altitude=0.0):
+    from planet_utils import get_planet_positions
+    t = observation_time(user_dt)
+    eph = load_ephemeris()
+    observer_at = (eph['earth'] + Topos(latitude_degrees=lat, longitude_degrees=lon)).at(t)
+    visible = []
+    for name, obj_type, alt, az in get_planet_positions(lat, lon, t):
+        if alt > min_altitude:
+            visible.append({'name': name, 'type': obj_type, 'altitude': round(alt, 2),
+                            'azimuth': round(az, 2), 'hip': 0, 'magnitude': float('nan')})
+    stars = _star_altaz(observer_at, mag_limit)
+    stars = stars[stars['altitude'] > min_altitude]
+    for hip, mag, alt, az in zip(stars['hip'].tolist(), stars['magnitude'].tolist(),
+                                 stars['altitude'].round(2).tolist(), stars['azimuth'].round(2).tolist()):
+        visible.append({'name': f"HIP {hip}", 'type': 'Star', 'altitude': alt, 'azimuth': az,
+                        'hip': hip, 'magnitude': mag})
+    visible.sort(key=lambda x: -x['altitude'])
+    return visible
+
+
+# Step 2: Retrieve Astronomical Data
+# describe=False skips the Wikipedia lookup for stars without a proper name in the catalog
+# (they keep "Common Name: None"), so the call never touches the network; servers use it
+# and leave descriptions to a separate, per-object request.
+def get_visible_objects(lat, lon, user_dt=None, describe=True):
+    from planet_utils import get_planet_positions
+    t = observation_time(user_dt)
+    with span('ephemeris_load'):
+        load_ephemeris()
+    visible = []
+
+    # For Planets, Sun, Moon (canonical body list, evaluated from the per-day tables)
+    with span('planet_loop'):
+        for name, obj_type, alt, az in get_planet_positions(lat, lon, t):
+            if alt > 0:
+                visible.append({
+                    'name': name,
+                    'type': obj_type,
+                    'altitude': round(alt, 2),
+                    'azimuth': round(az, 2),
+                    'raw_name': SOLAR_SYSTEM_BODIES[name][0]
+                })
+    # for Bright stars (Hipparcos, mag < 2.0)
+    # (positions for all of them in one vectorized call, serial or on a process pool)
+    with span('catalog_load'):
+        # The compact catalog has no per-star rows to look names up in
+        stars = None if COMPACT_CATALOG else load_star_catalog()
+    with span('star_loop'):
+        star_positions = get_star_altaz(lat, lon, user_dt, mag_limit=2.0)
+        above = star_positions[star_positions['altitude'] > 0]
+    with span('wikipedia_naming'):
+        for hip, mag, alt_deg, az_deg in zip(above['hip'], above['magnitude'], above['altitude'], above['azimuth']):
+            star_row = stars.loc[hip] if stars is not None else {}
+            # Try to get a common name from 'proper', else fetch from Wikipedia description, else None
+            star_name = star_row.get('proper')
+            common_name = None
+            if isinstance(star_name, str) and star_name.strip():
+                common_name = star_name.strip()
+            elif describe:
+                # Try to get name from Wikipedia description
+                desc = get_object_description(f"HIP {hip}")
+                if desc:
+                    match = re.match(r"([A-Z][a-zA-Z0-9\-]*) ", desc)
+                    if match:
+                        common_name = match.group(1)
+            if common_name:
+                name_to_use = f"Common Name: {common_name} | Name: HIP {hip}"
+            else:
+                name_to_use = f"Common Name: None | Name: HIP {hip}"
+            constellation = star_row['constellation'] if 'constellation' in star_row else ''
+            visible.append({
+                'name': name_to_use,
+                'type': 'Star',
+                'altitude': round(alt_deg, 2),
+                'azimuth': round(az_deg, 2),
+                'raw_name': f"HIP {hip}",
+                'constellation': constellation,
+                'magnitude': round(float(mag), 2)
+            })
+    with span('dedup_sort'):
+        return deduplicate_objects(visible)
+
+
+# Remove duplicates and sort by altitude descending
+def deduplicate_objects(visible):
+    seen = set()
+    unique_visible = []
+    for obj in sorted(visible, key=lambda x: -x['altitude']):
+        key = (obj['name'], obj['type'])
+        if key not in seen:
+            seen.add(key)
+            unique_visible.append(obj)
+    return unique_visible
@@ -0,0 +1,174 @@
+# Bulk visibility over a file of observing sites
+#
+#   python batch_cli.py sites.csv -o visible.parquet --mag-limit 4 --workers 8
+#
+# Input is CSV or Parquet with columns id, lat, lon, datetime (ISO 8601, UTC when no
+# offset is given). Rows are streamed in chunks to a process pool; every worker loads the
+# ephemeris and star catalog once in its initializer. Results are written chunk by chunk
+# (CSV, NDJSON, Parquet or Arrow, see export_utils) with progress on stderr.
+#
+# With --satellites every site also gets the satellites of the local TLE store above the
+# horizon cut-off. Per site only the satellites whose orbital plane is within reach of it
+# (prefilter_utils.pass_windows) are propagated.
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from datetime import datetime, timezone
+import os
+import sys
+import time
+
+from export_utils import EXPORT_FORMATS, iter_chunks, open_chunk_writer
+
+REQUIRED_COLUMNS = ('id', 'lat', 'lon', 'datetime')
+# One output row per visible object: the site, then compute_visibility's fields
+OUTPUT_COLUMNS = REQUIRED_COLUMNS + ('name', 'type', 'altitude', 'azimuth', 'hip', 'magnitude')
+DEFAULT_CHUNK_SIZE = 64
+
+_worker_options = {}
+
+
+def read_sites(path, batch_size=10000):
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=list(REQUIRED_COLUMNS)):
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+            if missing:
+                raise SystemExit(f"[ERROR] {path} is missing column(s): {', '.join(missing)}")
+            yield from reader
+
+
+def parse_site_time(value):
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).strip())
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+# --- Worker side ---
+def _init_worker(mag_limit, min_altitude, satellites=False):
+    from astro_utils import load_ephemeris, star_set, get_timescale
+    _worker_options.update(mag_limit=mag_limit, min_altitude=min_altitude, satellites=satellites)
+    load_ephemeris()
+    get_timescale()
+    star_set(mag_limit)
+    if satellites:
+        from tle_store import load_elements, satrecs_from_elements
+        elements = load_elements(refresh=False)
+        _worker_options.update(elements=elements, satrecs=satrecs_from_elements(elements))
+
+
+# Store satellites above the cut-off for one site, in the same row shape as compute_visibility
+def _site_satellites(lat, lon, dt):
+    import numpy as np
+    from astro_utils import observation_time
+    from prefilter_utils import pass_windows
+    from satellite_utils import build_propagator_from_satrecs, visible_satellites
+    elements, satrecs = _worker_options['elements'], _worker_options['satrecs']
+    min_altitude = _worker_options['min_altitude']
+    t = observation_time(dt)
+    candidates = np.flatnonzero(pass_windows(elements, lat, lon, t, min_altitude, pad=0)[:, 0])
+    if not len(candidates):
+        return []
+    propagator = build_propagator_from_satrecs(elements['name'][candidates].tolist(),
+                                               [satrecs[i] for i in candidates])
+    return [{'name': sat['name'], 'type': 'Satellite', 'altitude': sat['altitude'], 'azimuth': sat['azimuth'],
+             'hip': 0, 'magnitude': float('nan')}
+            for sat in visible_satellites(propagator, lat, lon, t, min_altitude)]
+
+
+def _process_chunk(sites):
+    from astro_utils import compute_visibility
+    results = []
+    errors = 0
+    for site in sites:
+        try:
+            lat, lon = float(site['lat']), float(site['lon'])
+            dt = parse_site_time(site['datetime'])
+        except (KeyError, TypeError, ValueError):
+            errors += 1
+            continue
+        objects = compute_visibility(lat, lon, dt, _worker_options['mag_limit'], _worker_options['min_altitude'])
+        if _worker_options['satellites']:
+            objects += _site_satellites(lat, lon, dt)
+        for obj in objects:
+            results.append({'id': str(site['id']), 'lat': lat, 'lon': lon, 'datetime': dt.isoformat(), **obj})
+    return len(sites), errors, results
+
+
+# Ordered map over chunks with at most max_pending chunks in flight, so the input is never
+# read ahead of the workers by more than that
+def _bounded_map(executor, fn, chunks, max_pending):
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(fn, chunk))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_batch(input_path, output_path, fmt=None, mag_limit=2.0, min_altitude=0.0,
+              workers=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=True, satellites=False):
+    fmt = fmt or os.path.splitext(output_path)[1].lstrip('.').lower() or 'csv'
+    if satellites:
+        # Ingest changed TLE files once here, so the workers only read the snapshot
+        from tle_store import load_elements, warn_if_stale
+        warn_if_stale(load_elements())
+    workers = workers or os.cpu_count()
+    started = time.perf_counter()
+    sites_done = objects_written = bad_rows = 0
+    with open(output_path, 'wb') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(mag_limit, min_altitude, satellites)) as executor:
+        writer = open_chunk_writer(out, fmt, OUTPUT_COLUMNS)
+        try:
+            chunks = iter_chunks(read_sites(input_path), chunk_size)
+            for n_sites, errors, results in _bounded_map(executor, _process_chunk, chunks, workers * 2):
+                if results:
+                    writer.write(results)
+                sites_done += n_sites
+                bad_rows += errors
+                objects_written += len(results)
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    print(f"\r[INFO] {sites_done} sites, {objects_written} objects, "
+                          f"{sites_done / elapsed:.1f} sites/s", end='', file=sys.stderr)
+        finally:
+            writer.close()
+    elapsed = time.perf_counter() - started
+    if progress:
+        print(file=sys.stderr)
+        print(f"[INFO] Done: {sites_done} sites ({bad_rows} skipped) -> {objects_written} objects "
+              f"in {elapsed:.1f}s ({sites_done / max(elapsed, 1e-9):.1f} sites/s, {workers} workers)",
+              file=sys.stderr)
+    return {'sites': sites_done, 'skipped': bad_rows, 'objects': objects_written, 'seconds': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute visible objects for every site in a CSV/Parquet file")
+    parser.add_argument('input', help='CSV or Parquet file with columns id, lat, lon, datetime')
+    parser.add_argument('-o', '--output', required=True, help='output file, format taken from the extension')
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), help='override the output format')
+    parser.add_argument('--mag-limit', type=float, default=2.0, help='faintest star magnitude (default 2.0)')
+    parser.add_argument('--min-altitude', type=float, default=0.0, help='horizon cut-off in degrees')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='sites per work item')
+    parser.add_argument('--satellites', action='store_true', help='also list satellites from the local TLE store')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+    run_batch(args.input, args.output, args.format, args.mag_limit, args.min_altitude,
+              args.workers, args.chunk_size, progress=not args.quiet, satellites=args.satellites)
+
+
+if __name__ == "__main__":
+    main()
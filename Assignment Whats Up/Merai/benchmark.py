@@ -0,0 +1,431 @@
+# Benchmark suite for the visibility pipeline
+#
+#   python benchmark.py                   # run everything, compare with benchmark_baseline.json
+#   python benchmark.py --only star       # only cases whose name contains "star"
+#   python benchmark.py --save-baseline   # add cases missing from the baseline
+#   python benchmark.py --rebaseline --rounds 3 --machine-note "8-core CI runner"   # re-record all
+#
+# Run it from the directory holding de421.bsp and hip_main.dat, like the app itself.
+# Wikipedia and geocoder calls are answered by a local stand-in, so the numbers do not
+# depend on the network. Each case reports the median of --repeat runs and its spread
+# (scaled MAD). Every run is paired with a run of a fixed reference workload, and the
+# baseline is scaled by how much slower or faster that reference got over the whole pass,
+# so a machine that is busier or clocked lower than when the baseline was taken does not
+# read as a regression.
+#
+# The exit code is 1 when a case's median is slower than its scaled baseline by more than
+# --threshold and by more than NOISE_SIGMAS times its noise, or when a case breaks its
+# absolute budget in BUDGETS. The noise is the largest of the case's spread (now or in the
+# baseline) and the machine's jitter, the relative spread of all reference runs in the
+# pass, times the case's baseline. Sub-millisecond cases mostly live on the jitter.
+# PARALLEL_CASES need more than one CPU and are only compared with a baseline from a
+# machine with the same count.
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+SITE = (53.5511, 9.9937)  # Hamburg
+WHEN = datetime(2025, 6, 5, 22, 0, tzinfo=timezone.utc)
+MULTI_SITES = [(lat, lon) for lat in (-40, -10, 20, 50) for lon in (-120, -30, 60, 150)]
+# Absolute limits in seconds, checked on every run whatever the baseline says.
+# import_core: a fresh "from Merai import get_visible_objects" took 2-2.5s while Merai.py
+# imported the whole UI stack; pandas + skyfield alone are about 0.7s of it.
+BUDGETS = {'import_core': 1.2}
+DEFAULT_REPEAT = 9
+# A slowdown must exceed this many times the case's noise (see above)
+NOISE_SIGMAS = 3.0
+# A scripted get_visible_objects call must not drag in any of these
+UI_MODULES = ('streamlit', 'pydeck', 'matplotlib', 'PIL', 'geocoder', 'requests')
+
+
+# --- Local stand-in for the network ---
+class _StandInResponse:
+    def __init__(self, url):
+        self.status_code = 200
+        self.url = url
+        self.content = b''
+
+    def json(self):
+        title = self.url.rsplit('/', 1)[-1]
+        return {'extract': f"{title} is an object in the constellation Orion, designation {title}.",
+                'thumbnail': {'source': f"https://example.invalid/{title}.jpg"}}
+
+
+class _StandInGeocode:
+    ok = True
+    latlng = list(SITE)
+    city = 'Hamburg'
+    country = 'DE'
+
+
+@contextmanager
+def offline_network():
+    with mock.patch('requests.get', lambda url, *a, **kw: _StandInResponse(url)), \
+            mock.patch('geocoder.ip', lambda *a, **kw: _StandInGeocode()):
+        yield
+
+
+# Reference workload timed next to every case: interpreter-bound and numpy-bound halves,
+# about 10ms in total
+def _reference():
+    total = 0
+    for i in range(60000):
+        total += i % 7
+    angles = np.linspace(0.0, 6.0, 200000)
+    return total + float(np.sum(np.sin(angles) * np.cos(angles)))
+
+
+# --- Cases: each setup returns the callable that gets timed ---
+def _import_core():
+    code = ("import sys; from Merai import get_visible_objects; "
+            f"print(','.join(m for m in {UI_MODULES!r} if m in sys.modules))")
+
+    def run():
+        # Fresh interpreter each time, the import cache of this process would hide everything
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        if out:
+            raise RuntimeError(f"Importing the compute core loaded UI modules: {out}")
+    return run
+
+
+def _catalog_load():
+    import catalog_utils
+
+    def run():
+        catalog_utils._catalogs.clear()
+        catalog_utils.load_star_catalog()
+    return run
+
+
+def _ephemeris_load():
+    import astro_utils
+
+    def run():
+        astro_utils._ephemerides.clear()
+        astro_utils.load_ephemeris()
+    return run
+
+
+def _planet_loop():
+    from skyfield.api import Topos
+    from astro_utils import get_planet_altaz, load_ephemeris, observation_time
+    observer_at = (load_ephemeris()['earth'] + Topos(latitude_degrees=SITE[0], longitude_degrees=SITE[1])).at(
+        observation_time(WHEN))
+    return lambda: get_planet_altaz(observer_at)
+
+
+def _planet_tables():
+    from astro_utils import observation_time
+    from planet_utils import get_planet_positions
+    t = observation_time(WHEN)
+    return lambda: get_planet_positions(SITE[0], SITE[1], t)
+
+
+def _star_loop(mag_limit):
+    def setup():
+        from astro_utils import get_star_altaz
+        return lambda: get_star_altaz(SITE[0], SITE[1], WHEN, mag_limit=mag_limit, backend='serial')
+    return setup
+
+
+def _time_series(backend='serial'):
+    def setup():
+        from astro_utils import get_timescale
+        from parallel_utils import star_altaz_table
+        times = get_timescale().from_datetimes([WHEN + timedelta(hours=h) for h in range(24)])
+        return lambda: star_altaz_table(SITE[0], SITE[1], times, 4.0, backend)
+    return setup
+
+
+def _multi_observer():
+    from astro_utils import compute_visibility
+    return lambda: [compute_visibility(lat, lon, WHEN) for lat, lon in MULTI_SITES]
+
+
+def _almanac():
+    import almanac_utils
+
+    def run():
+        almanac_utils._almanacs.clear()
+        almanac_utils.almanac_for_date(SITE[0], SITE[1], WHEN.date(), mag_limit=4.0)
+    return run
+
+
+# Random low-Earth orbits shaped like a CelesTrak "active" set
+def _synthetic_propagator(n, seed=0):
+    from sgp4.api import Satrec, WGS72
+    from satellite_utils import build_propagator_from_satrecs
+    rng = np.random.default_rng(seed)
+    epoch = 2460831.5 - 2433281.5  # WHEN's date in days since 1949 Dec 31, as sgp4init wants
+    satrecs = []
+    for i in range(n):
+        sat = Satrec()
+        sat.sgp4init(WGS72, 'i', i + 1, epoch, 2e-4, 0.0, 0.0, rng.uniform(0, 0.02),
+                     rng.uniform(0, 2 * np.pi), np.radians(rng.uniform(0, 100)), rng.uniform(0, 2 * np.pi),
+                     rng.uniform(14.0, 16.0) * 2 * np.pi / 1440, rng.uniform(0, 2 * np.pi))
+        satrecs.append(sat)
+    return build_propagator_from_satrecs([f"SAT {i + 1}" for i in range(n)], satrecs)
+
+
+def _satellites(n_sats, n_times):
+    def setup():
+        from astro_utils import get_timescale
+        from satellite_utils import satellite_altaz
+        propagator = _synthetic_propagator(n_sats)
+        times = get_timescale().from_datetimes([WHEN + timedelta(minutes=m) for m in range(n_times)])
+        return lambda: satellite_altaz(propagator, SITE[0], SITE[1], times)
+    return setup
+
+
+def _passes(n_sats, hours, backend='serial'):
+    def setup():
+        from pass_utils import predict_passes
+        from tle_store import elements_from_satrecs
+        propagator = _synthetic_propagator(n_sats)
+        elements = elements_from_satrecs(propagator['names'], propagator['satrecs'])
+        return lambda: predict_passes(SITE[0], SITE[1], WHEN, hours, elements, backend=backend)
+    return setup
+
+
+# Stereographic chart coordinates for every catalog star, horizon-clipped and culled
+def _projection():
+    from projection_utils import project
+    rng = np.random.default_rng(0)
+    n = 118000
+    altitude, azimuth = rng.uniform(-90, 90, n), rng.uniform(0, 360, n)
+    return lambda: project(altitude, azimuth, 'stereographic', center=(40.0, 180.0), fov=120.0)
+
+
+def _synthetic_objects(n, seed=0):
+    rng = np.random.default_rng(seed)
+    objects = [{'name': f"Common Name: None | Name: HIP {i % (n // 2 or 1)}", 'type': 'Star',
+                'altitude': round(float(rng.uniform(0, 90)), 2), 'azimuth': round(float(rng.uniform(0, 360)), 2),
+                'raw_name': f"HIP {i}", 'magnitude': round(float(rng.uniform(-1, 6.5)), 2)} for i in range(n)]
+    objects += [{'name': 'Sun', 'type': 'Sun', 'altitude': 10.0, 'azimuth': 300.0},
+                {'name': 'Mars', 'type': 'Planet', 'altitude': 25.0, 'azimuth': 200.0}]
+    return objects
+
+
+def _dedup():
+    from astro_utils import deduplicate_objects
+    objects = _synthetic_objects(10000)
+    return lambda: deduplicate_objects(objects)
+
+
+def _visible_objects():
+    from astro_utils import get_visible_objects
+    return lambda: get_visible_objects(SITE[0], SITE[1], WHEN)
+
+
+# star_field: reproject the tile pyramid underneath (tiles are warm after the warm-up run)
+def _chart(cached, star_field=False):
+    def setup():
+        from visualization import clear_chart_cache, render_sky_chart
+        objects = _synthetic_objects(2000, seed=1)
+        site = (SITE[0], SITE[1], WHEN) if star_field else None
+        if cached:
+            render_sky_chart(objects, site=site)
+            return lambda: render_sky_chart(objects, site=site)
+
+        def run():
+            clear_chart_cache()
+            render_sky_chart(objects, site=site)
+        return run
+    return setup
+
+
+# A 24-frame stereographic night timelapse into memory, in this process (no pool)
+def _timelapse():
+    from io import BytesIO
+    from timelapse_utils import render_timelapse
+    return lambda: render_timelapse(SITE[0], SITE[1], BytesIO(), WHEN, WHEN + timedelta(hours=8), frames=24,
+                                    workers=1)
+
+
+BENCHMARKS = [
+    ('import_core', _import_core),
+    ('catalog_load', _catalog_load),
+    ('ephemeris_load', _ephemeris_load),
+    ('planet_loop', _planet_loop),
+    ('planet_tables', _planet_tables),
+    ('star_loop_mag2', _star_loop(2.0)),
+    ('star_loop_mag4', _star_loop(4.0)),
+    ('star_loop_mag6.5', _star_loop(6.5)),
+    ('time_series_24h_mag4', _time_series()),
+    ('time_series_24h_mag4_process', _time_series('process')),
+    ('multi_observer_16_sites', _multi_observer),
+    ('almanac_day_mag4', _almanac),
+    ('satellites_10k_now', _satellites(10000, 1)),
+    ('satellites_10k_60min', _satellites(10000, 60)),
+    ('passes_500_24h', _passes(500, 24)),
+    ('passes_500_24h_process', _passes(500, 24, 'process')),
+    ('projection_118k', _projection),
+    ('dedup_10k', _dedup),
+    ('get_visible_objects', _visible_objects),
+    ('chart_render_2000', _chart(cached=False)),
+    ('chart_render_cached', _chart(cached=True)),
+    ('chart_render_star_field', _chart(cached=False, star_field=True)),
+    ('timelapse_24_frames', _timelapse),
+]
+# Process-pool cases: skipped on one CPU, where they only measure pool overhead
+PARALLEL_CASES = ('time_series_24h_mag4_process', 'passes_500_24h_process')
+
+
+def _median_spread(samples):
+    samples = np.asarray(samples)
+    median = float(np.median(samples))
+    return median, 1.4826 * float(np.median(np.abs(samples - median)))
+
+
+# `repeat` timed runs of one case, each paired with a run of the reference workload.
+# Returns both lists of seconds.
+def time_case(setup, repeat):
+    fn = setup()
+    fn()  # warm-up: imports, lazily loaded data, process pools
+    samples, reference = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _reference()
+        reference.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples, reference
+
+
+def machine_info(note=None):
+    info = {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()}
+    if note:
+        info['note'] = note
+    return info
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {'machine': {}, 'results': {}, 'spread': {}, 'reference': None, 'jitter': 0.0}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data.setdefault('spread', {})
+    data.setdefault('reference', None)
+    data.setdefault('jitter', 0.0)
+    return data
+
+
+def save_baseline(baseline, path=BASELINE_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'machine': baseline['machine'], 'recorded': baseline['recorded'],
+                   'results': baseline['results'], 'spread': baseline['spread'],
+                   'reference': baseline['reference'], 'jitter': baseline['jitter']}, f, indent=2)
+        f.write('\n')
+
+
+def is_regression(median, base, noise, threshold=1.3, sigmas=NOISE_SIGMAS):
+    return median > base * threshold and median - base > sigmas * noise
+
+
+# rounds > 1 goes through the whole suite that many times and pools the runs, so the spread
+# also covers the drift between one pass and the next (use it when recording a baseline)
+def run_benchmarks(only=None, repeat=DEFAULT_REPEAT, threshold=1.3, baseline_path=BASELINE_FILE,
+                   sigmas=NOISE_SIGMAS, rounds=1):
+    baseline = load_baseline(baseline_path)
+    same_cpus = baseline['machine'].get('cpus') == os.cpu_count()
+    cases = [(name, setup) for name, setup in BENCHMARKS if not only or only in name]
+    samples = {name: ([], []) for name, _ in cases}
+    with offline_network():
+        for _ in range(rounds):
+            for name, setup in cases:
+                if name in PARALLEL_CASES and (os.cpu_count() or 1) < 2:
+                    continue
+                runs, reference = time_case(setup, repeat)
+                samples[name][0].extend(runs)
+                samples[name][1].extend(reference)
+    all_reference = [ref for _, reference in samples.values() for ref in reference]
+    reference, reference_spread = _median_spread(all_reference) if all_reference else (None, 0.0)
+    jitter = reference_spread / reference if reference else 0.0
+    # Scale the baseline (and its spread) to how fast this machine is right now
+    scale = reference / baseline['reference'] if reference and baseline['reference'] else 1.0
+    results, spreads = {}, {}
+    regressions = []
+    print(f"{'case':<30}{'median':>11}{'spread':>10}{'scaled base':>13}{'ratio':>8}")
+    for name, _ in cases:
+        runs = samples[name][0]
+        if not runs:
+            print(f"{name:<30}{'skipped (one CPU)':>21}")
+            continue
+        seconds, spread = _median_spread(runs)
+        results[name], spreads[name] = seconds, spread
+        base = baseline['results'].get(name)
+        if name in PARALLEL_CASES and not same_cpus:
+            base = None
+        base = base * scale if base else None
+        ratio = seconds / base if base else None
+        flag = ''
+        if base and is_regression(seconds, base, max(spread, baseline['spread'].get(name, 0.0) * scale,
+                                                     max(jitter, baseline['jitter']) * base), threshold, sigmas):
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif name in BUDGETS and seconds > BUDGETS[name]:
+            flag = f"  OVER BUDGET ({BUDGETS[name] * 1000:.0f}ms)"
+            regressions.append(name)
+        print(f"{name:<30}{seconds * 1000:>9.1f}ms{spread * 1000:>8.1f}ms"
+              f"{(f'{base * 1000:.1f}ms' if base else '-'):>13}"
+              f"{(f'{ratio:.2f}' if ratio else '-'):>8}{flag}")
+    print(f"[INFO] Reference workload {reference * 1000 if reference else 0:.1f}ms "
+          f"({scale:.2f}x the baseline's), jitter {jitter:.1%}")
+    return results, spreads, {'reference': reference, 'jitter': jitter}, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Merai visibility pipeline")
+    parser.add_argument('--only', help='run only cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--rounds', type=int, default=1, help='passes over the suite, pooled (3 for a baseline)')
+    parser.add_argument('--threshold', type=float, default=1.3, help='slowdown ratio reported as a regression')
+    parser.add_argument('--sigmas', type=float, default=NOISE_SIGMAS,
+                        help='slowdown, in spreads, below which a case is never reported')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='add the cases the baseline does not have yet, keep the recorded ones')
+    parser.add_argument('--rebaseline', action='store_true', help='replace the baseline with this run')
+    parser.add_argument('--machine-note', help='description of this machine, stored with --rebaseline')
+    args = parser.parse_args()
+    results, spreads, speed, regressions = run_benchmarks(args.only, args.repeat, args.threshold, args.baseline,
+                                                          args.sigmas, args.rounds)
+    if args.rebaseline:
+        save_baseline({'machine': machine_info(args.machine_note),
+                       'recorded': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                       'results': results, 'spread': spreads, **speed}, args.baseline)
+        print(f"[INFO] Baseline written to {args.baseline}")
+    elif args.save_baseline:
+        baseline = load_baseline(args.baseline)
+        if not baseline['results']:
+            print("[WARN] No baseline yet, record one with --rebaseline")
+            sys.exit(1)
+        if baseline['machine'].get('cpus') != os.cpu_count():
+            print("[WARN] The baseline was recorded on another machine, re-record it with --rebaseline")
+            sys.exit(1)
+        # New cases are stored at the speed the machine had when the baseline was taken
+        scale = baseline['reference'] / speed['reference'] if baseline['reference'] and speed['reference'] else 1.0
+        added = [name for name in results if name not in baseline['results']]
+        for name in added:
+            baseline['results'][name], baseline['spread'][name] = results[name] * scale, spreads[name] * scale
+        save_baseline(baseline, args.baseline)
+        print(f"[INFO] Added {', '.join(added) or 'no new cases'} to {args.baseline}")
+    elif regressions:
+        print(f"[WARN] {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
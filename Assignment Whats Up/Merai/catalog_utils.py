@@ -0,0 +1,179 @@
+# Star catalog loading
+# The Hipparcos catalog is parsed once per process and shared by every caller,
+# instead of re-reading hip_main.dat inside each loop.
+#
+#   python catalog_utils.py     # print the memory footprint of each catalog representation
+import json
+import os
+
+import numpy as np
+from skyfield.api import load
+from skyfield.data import hipparcos
+
+from paths import CACHE_DIR
+from reference_data import HIP_NAMES_FILE, load_reference_table
+
+CATALOG_ARRAY_DIR = os.path.join(CACHE_DIR, 'catalog_arrays')
+# Columns exported as flat .npy files for memory-mapping by worker processes
+CATALOG_ARRAY_FIELDS = ('hip', 'magnitude', 'ra_hours', 'dec_degrees',
+                        'ra_mas_per_year', 'dec_mas_per_year', 'parallax_mas', 'epoch_year')
+# Compact catalog for memory-constrained deployments (MERAI_COMPACT_CATALOG=1): only the
+# fields the app uses, in float32/int32. float32 keeps RA/Dec to about 0.01 arcsec.
+COMPACT_CATALOG = os.environ.get('MERAI_COMPACT_CATALOG') == '1'
+COMPACT_CATALOG_DIR = os.path.join(CACHE_DIR, 'catalog_compact')
+COMPACT_FIELDS = {
+    'hip': np.int32,
+    'ra_hours': np.float32,
+    'dec_degrees': np.float32,
+    'ra_mas_per_year': np.float32,
+    'dec_mas_per_year': np.float32,
+    'magnitude': np.float32,
+    'name_index': np.int32,  # position in the catalog's 'names' list, -1 when unnamed
+}
+# Every Hipparcos position is given for epoch J1991.25
+HIPPARCOS_EPOCH = 1721045.0 + 1991.25 * 365.25
+
+_catalogs = {}
+_catalog_arrays = {}
+_compact_catalogs = {}
+
+
+def load_star_catalog(url=hipparcos.URL):
+    if url not in _catalogs:
+        with load.open(url) as f:
+            stars = hipparcos.load_dataframe(f)
+        # A few hundred entries have no position at all, skyfield cannot observe those
+        _catalogs[url] = stars[stars['ra_degrees'].notnull()]
+    return _catalogs[url]
+
+
+# Write the catalog as one .npy file per column, sorted brightest first so that any
+# magnitude limit is just a prefix of the arrays
+def save_catalog_arrays(array_dir=CATALOG_ARRAY_DIR):
+    stars = load_star_catalog().sort_values('magnitude', na_position='last')
+    os.makedirs(array_dir, exist_ok=True)
+    for field in CATALOG_ARRAY_FIELDS:
+        values = stars.index.to_numpy() if field == 'hip' else stars[field].to_numpy(dtype=float)
+        # Missing proper motion/parallax would turn the whole position into NaN
+        if field in ('ra_mas_per_year', 'dec_mas_per_year', 'parallax_mas'):
+            values = np.nan_to_num(values)
+        np.save(os.path.join(array_dir, field + '.npy'), values)
+
+
+# Read-only memory-mapped catalog columns; every process mapping the same files shares
+# the page cache instead of holding (or unpickling) its own copy
+def load_catalog_arrays(array_dir=CATALOG_ARRAY_DIR):
+    if array_dir not in _catalog_arrays:
+        if not all(os.path.exists(os.path.join(array_dir, f + '.npy')) for f in CATALOG_ARRAY_FIELDS):
+            save_catalog_arrays(array_dir)
+        _catalog_arrays[array_dir] = {
+            field: np.load(os.path.join(array_dir, field + '.npy'), mmap_mode='r')
+            for field in CATALOG_ARRAY_FIELDS
+        }
+    return _catalog_arrays[array_dir]
+
+
+# Number of leading (brightest) catalog entries with magnitude < mag_limit
+def magnitude_prefix(arrays, mag_limit=None):
+    if mag_limit is None:
+        return len(arrays['hip'])
+    return int(np.searchsorted(arrays['magnitude'], mag_limit, side='left'))
+
+
+# Display names ("α Ori") indexed by integer HIP id, one row per star, from a table with
+# bayer/con columns and hip as a column or the index (load_reference_table); rows missing
+# any of the three are left out
+def bayer_name_table(hip_name_df):
+    import pandas as pd
+    if 'hip' not in hip_name_df.columns:
+        hip_name_df = hip_name_df.reset_index()
+    names = hip_name_df.dropna(subset=['hip', 'bayer', 'con']).drop_duplicates('hip')
+    index = pd.Index(names['hip'].to_numpy(dtype=np.int64), name='hip')
+    return pd.Series((names['bayer'].astype(str) + ' ' + names['con'].astype(str)).to_numpy(),
+                     index=index, name='bayer_name')
+
+
+# bayer_name_table of hip_name.csv.xlsx, None when the sheet is missing
+def _hip_bayer_names(path=HIP_NAMES_FILE):
+    names = load_reference_table(path)
+    return bayer_name_table(names) if names is not None else None
+
+
+# Write the compact catalog: one typed .npy file per field (brightest first, like the
+# float64 arrays) plus names.json holding the distinct star names
+def save_compact_catalog(compact_dir=COMPACT_CATALOG_DIR):
+    stars = load_star_catalog().sort_values('magnitude', na_position='last')
+    bayer = _hip_bayer_names()
+    names = sorted(set(bayer)) if bayer is not None else []
+    # One join of the whole catalog against the name table, then each named star's name as
+    # a position in the sorted distinct names
+    name_index = np.full(len(stars), -1)
+    if names:
+        star_names = bayer.reindex(stars.index)
+        named = star_names.notna().to_numpy()
+        name_index[named] = np.searchsorted(np.array(names, dtype=object), star_names[named].to_numpy(dtype=object))
+    columns = {
+        'hip': stars.index.to_numpy(),
+        'ra_hours': stars['ra_hours'].to_numpy(dtype=float),
+        'dec_degrees': stars['dec_degrees'].to_numpy(dtype=float),
+        'ra_mas_per_year': np.nan_to_num(stars['ra_mas_per_year'].to_numpy(dtype=float)),
+        'dec_mas_per_year': np.nan_to_num(stars['dec_mas_per_year'].to_numpy(dtype=float)),
+        'magnitude': stars['magnitude'].to_numpy(dtype=float),
+        'name_index': name_index,
+    }
+    os.makedirs(compact_dir, exist_ok=True)
+    for field, dtype in COMPACT_FIELDS.items():
+        np.save(os.path.join(compact_dir, field + '.npy'), np.asarray(columns[field], dtype=dtype))
+    with open(os.path.join(compact_dir, 'names.json'), 'w', encoding='utf-8') as f:
+        json.dump(names, f, ensure_ascii=False)
+
+
+# Read-only memory-mapped compact catalog, built on first use. All sessions and worker
+# processes on a machine share the same pages; no per-session DataFrame is created.
+def load_compact_catalog(compact_dir=COMPACT_CATALOG_DIR):
+    if compact_dir not in _compact_catalogs:
+        names_path = os.path.join(compact_dir, 'names.json')
+        if not os.path.exists(names_path) or not all(
+                os.path.exists(os.path.join(compact_dir, f + '.npy')) for f in COMPACT_FIELDS):
+            save_compact_catalog(compact_dir)
+        catalog = {field: np.load(os.path.join(compact_dir, field + '.npy'), mmap_mode='r')
+                   for field in COMPACT_FIELDS}
+        with open(names_path, 'r', encoding='utf-8') as f:
+            catalog['names'] = tuple(json.load(f))
+        _compact_catalogs[compact_dir] = catalog
+    return _compact_catalogs[compact_dir]
+
+
+# Name of catalog entry i, or None
+def compact_star_name(catalog, i):
+    index = int(catalog['name_index'][i])
+    return catalog['names'][index] if index >= 0 else None
+
+
+# Bytes held by each field of a catalog dict (memmaps count their mapped size)
+def catalog_footprint(catalog):
+    footprint = {field: values.nbytes for field, values in catalog.items() if hasattr(values, 'nbytes')}
+    if 'names' in catalog:
+        footprint['names'] = sum(len(name.encode('utf-8')) for name in catalog['names'])
+    return footprint
+
+
+# Footprint of the pandas DataFrame, the float64 arrays and the compact catalog, in bytes
+def footprint_report():
+    frame = load_star_catalog()
+    return {
+        'dataframe': int(frame.memory_usage(deep=True).sum()),
+        'float64 arrays': sum(catalog_footprint(load_catalog_arrays()).values()),
+        'compact': sum(catalog_footprint(load_compact_catalog()).values()),
+    }
+
+
+if __name__ == "__main__":
+    report = footprint_report()
+    n_stars = len(load_compact_catalog()['hip'])
+    print(f"{'representation':<16}{'MiB':>8}{'bytes/star':>12}")
+    for name, size in report.items():
+        print(f"{name:<16}{size / 2 ** 20:>8.2f}{size / n_stars:>12.1f}")
+    print("Per field (compact):")
+    for field, size in catalog_footprint(load_compact_catalog()).items():
+        print(f"  {field:<18}{size / 1024:>9.1f} KiB")
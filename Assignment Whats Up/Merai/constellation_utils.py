@@ -0,0 +1,112 @@
+# Constellation line figures (Stellarium constellationship.fab format)
+#
+# load_constellation_segments parses the file once into integer arrays; resolve_segments
+# turns the HIP ids into row positions of whatever star table is being drawn, and
+# horizon_segments projects all resolved segments for a polar (azimuth, 90 - altitude)
+# chart in one vectorized pass (projection_utils), clipped at the horizon, ready for a
+# single LineCollection.
+# constellation_label_positions places one label per constellation from those segments.
+import os
+
+import numpy as np
+import pandas as pd
+
+from projection_utils import project_segments, to_polar
+
+CONSTELLATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'constellationship.fab')
+
+_segments = {}
+
+
+# Each line reads "<abbr> <pair count> hip1 hip2 hip3 hip4 ...", returns (abbr, hip1, hip2) tuples
+def load_constellation_lines(filepath=CONSTELLATION_FILE):
+    lines = []
+    if not os.path.exists(filepath):
+        print(f"[WARN] Constellation file not found: {filepath}")
+        return lines
+    with open(filepath, 'r') as file:
+        for line in file:
+            parts = line.strip().split()
+            if len(parts) < 3:
+                continue
+            try:
+                ids = list(map(int, parts[2:]))
+            except ValueError:
+                continue
+            for i in range(0, len(ids) - 1, 2):
+                lines.append((parts[0], ids[i], ids[i + 1]))
+    return lines
+
+
+# The whole file as arrays, parsed once per path: 'hip' (n_segments, 2) int32 endpoint HIP
+# ids, 'con' (n_segments,) int16 index into 'codes', the constellation abbreviations
+def load_constellation_segments(filepath=CONSTELLATION_FILE):
+    if filepath not in _segments:
+        lines = load_constellation_lines(filepath)
+        codes, con = np.unique(np.array([abbr for abbr, _, _ in lines], dtype=str), return_inverse=True)
+        _segments[filepath] = {
+            'codes': codes,
+            'con': con.astype(np.int16),
+            'hip': np.array([(hip1, hip2) for _, hip1, hip2 in lines], dtype=np.int32).reshape(-1, 2),
+        }
+    return _segments[filepath]
+
+
+# Row positions of both endpoints of every segment in a star table whose HIP ids are
+# hip_ids, shape (n_segments, 2); -1 where the star is not in the table
+def resolve_segments(segments, hip_ids):
+    hip_ids = np.asarray(hip_ids)
+    if not len(hip_ids):
+        return np.full(segments['hip'].shape, -1)
+    order = np.argsort(hip_ids, kind='stable')
+    pos = np.clip(np.searchsorted(hip_ids, segments['hip'], sorter=order), 0, len(hip_ids) - 1)
+    found = hip_ids[order[pos]] == segments['hip']
+    return np.where(found, order[pos], -1)
+
+
+# Polar chart coordinates (theta = azimuth in radians, r = chart radius; r = 90 - altitude
+# for the default polar projection) of the resolved segments with at least one end above
+# the horizon, shape (n, 2, 2), and the row of each in the segment arrays (for
+# segments['con'] or segments['hip']). Segments crossing the horizon are cut where their
+# great circle meets it (projection_utils.project_segments), and the second end's azimuth
+# is unwrapped so no segment goes the long way round the pole.
+def horizon_segments(segments, idx, altitude, azimuth, projection='polar'):
+    rows = np.flatnonzero((idx >= 0).all(axis=1))
+    idx = idx[rows]
+    xy, kept = project_segments(np.asarray(altitude, dtype=float)[idx], np.asarray(azimuth, dtype=float)[idx],
+                                projection)
+    theta, r = to_polar(xy[..., 0], xy[..., 1])
+    theta[:, 1] = theta[:, 0] + (theta[:, 1] - theta[:, 0] + np.pi) % (2 * np.pi) - np.pi
+    return np.stack([theta, r], axis=-1), rows[kept]
+
+
+# Push points (n, 2) apart until no two are closer than min_separation, all pairs at once
+# per iteration; points stay inside the chart (radius 90)
+def spread_labels(xy, min_separation, iterations=50):
+    xy = np.array(xy, dtype=float)
+    for _ in range(iterations):
+        delta = xy[:, None, :] - xy[None, :, :]
+        dist = np.hypot(delta[..., 0], delta[..., 1])
+        np.fill_diagonal(dist, np.inf)
+        overlap = np.clip(min_separation - dist, 0, None)
+        if not overlap.any():
+            break
+        xy += 0.5 * ((overlap / np.maximum(dist, 1e-9))[..., None] * delta).sum(axis=1)
+        r = np.hypot(xy[:, 0], xy[:, 1])
+        xy *= np.minimum(1.0, 90.0 / np.maximum(r, 1e-9))[:, None]
+    return xy
+
+
+# One label anchor per constellation: the mean of the midpoints of its drawn segments,
+# averaged in the chart plane so azimuths either side of north do not cancel out. labels
+# names the constellation of every segment (NaN/None to leave it out). Returns a DataFrame
+# with columns con, theta, r; min_separation > 0 spreads labels that would overlap.
+def constellation_label_positions(polar, labels, min_separation=0.0):
+    x, y = polar[..., 1] * np.sin(polar[..., 0]), polar[..., 1] * np.cos(polar[..., 0])
+    midpoints = pd.DataFrame({'con': labels, 'x': x.mean(axis=1), 'y': y.mean(axis=1)}).dropna(subset=['con'])
+    centers = midpoints.groupby('con')[['x', 'y']].mean()
+    xy = centers.to_numpy()
+    if min_separation > 0 and len(xy) > 1:
+        xy = spread_labels(xy, min_separation)
+    return pd.DataFrame({'con': centers.index, 'theta': np.arctan2(xy[:, 0], xy[:, 1]),
+                         'r': np.hypot(xy[:, 0], xy[:, 1])})
@@ -0,0 +1,165 @@
+# Export of visible-object tables
+# Rows are encoded chunk by chunk, so a multi-night or multi-site result never has to exist
+# as one DataFrame or one big in-memory string. CSV and NDJSON chunks go straight into the
+# output file; Parquet/Arrow chunks go to a spooled temporary file first and the output is
+# only written by close() (see _ArrowChunkWriter).
+import csv
+import io
+import itertools
+import json
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Parquet/Arrow export is optional, CSV and NDJSON always work
+    pa = None
+
+# format -> (mime type, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv', False),
+    'ndjson': ('application/x-ndjson', '.ndjson', False),
+    'parquet': ('application/vnd.apache.parquet', '.parquet', True),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrow', True),
+}
+DEFAULT_CHUNK_SIZE = 5000
+# Temporary exports stay in memory up to this size, then spill to disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def available_formats():
+    return [fmt for fmt, (_, _, needs_arrow) in EXPORT_FORMATS.items() if pa is not None or not needs_arrow]
+
+
+def iter_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _CsvChunkWriter:
+    # The header is `columns` when given, otherwise every key of the first chunk in order of
+    # appearance. Missing keys are written empty; a key the header does not have raises
+    # ValueError (csv.DictWriter's default), since the header is already in the file by then.
+    def __init__(self, out, columns=None):
+        self.out = out
+        self.fieldnames = list(columns) if columns is not None else None
+        self.header_written = False
+
+    def write(self, chunk):
+        buf = io.StringIO()
+        if self.fieldnames is None:
+            self.fieldnames = list(dict.fromkeys(key for row in chunk for key in row))
+        writer = csv.DictWriter(buf, fieldnames=self.fieldnames, lineterminator='\n')
+        if not self.header_written:
+            writer.writeheader()
+            self.header_written = True
+        writer.writerows(chunk)
+        self.out.write(buf.getvalue().encode('utf-8'))
+
+    def close(self):
+        # An empty export still gets its header when the columns are known
+        if not self.header_written and self.fieldnames:
+            buf = io.StringIO()
+            csv.writer(buf, lineterminator='\n').writerow(self.fieldnames)
+            self.out.write(buf.getvalue().encode('utf-8'))
+
+
+class _NdjsonChunkWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, chunk):
+        lines = ''.join(json.dumps(row, ensure_ascii=False, default=str) + '\n' for row in chunk)
+        self.out.write(lines.encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class _ArrowChunkWriter:
+    # Parquet gets one row group per chunk, Arrow IPC one record batch per chunk. A chunk
+    # alone cannot fix the schema (a column that is all None there has no type yet, an int
+    # column may hold floats later), so chunks are first spooled as Arrow IPC with their own
+    # inferred types. close() unifies those schemas, promoting null and int columns, and
+    # writes every chunk cast to the result; only one chunk is in memory at a time. Nothing
+    # reaches `out` before close(), the output file is complete only after it.
+    def __init__(self, out, fmt):
+        if pa is None:
+            raise ImportError(f"Exporting as {fmt} needs pyarrow (pip install pyarrow)")
+        self.out = out
+        self.fmt = fmt
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self.chunks = []  # (offset, length) of each chunk's IPC stream in the spool
+        self.schemas = []
+
+    def write(self, chunk):
+        table = pa.Table.from_pylist(chunk)
+        sink = pa.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as stream:
+            stream.write_table(table)
+        data = sink.getvalue()
+        self.chunks.append((self.spool.tell(), data.size))
+        self.spool.write(data)
+        self.schemas.append(table.schema)
+
+    def _read_chunk(self, offset, length):
+        self.spool.seek(offset)
+        return pyarrow.ipc.open_stream(self.spool.read(length)).read_all()
+
+    def close(self):
+        try:
+            schema = pa.unify_schemas(self.schemas, promote_options='permissive') if self.schemas else pa.schema([])
+            if self.fmt == 'parquet':
+                writer = pyarrow.parquet.ParquetWriter(self.out, schema)
+            else:
+                writer = pyarrow.ipc.new_stream(self.out, schema)
+            with writer:
+                for offset, length in self.chunks:
+                    table = self._read_chunk(offset, length)
+                    columns = [table[field.name].cast(field.type) if field.name in table.column_names
+                               else pa.nulls(len(table), field.type) for field in schema]
+                    writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        finally:
+            self.spool.close()
+
+
+# columns fixes the CSV header; the other formats take every key they are given
+def open_chunk_writer(out, fmt, columns=None):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', choose one of {', '.join(EXPORT_FORMATS)}")
+    if fmt == 'csv':
+        return _CsvChunkWriter(out, columns)
+    if fmt == 'ndjson':
+        return _NdjsonChunkWriter(out)
+    return _ArrowChunkWriter(out, fmt)
+
+
+# Write an iterable of row dicts to a binary file object, returns the number of rows written
+def stream_export(rows, out, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    writer = open_chunk_writer(out, fmt, columns)
+    count = 0
+    try:
+        for chunk in iter_chunks(rows, chunk_size):
+            writer.write(chunk)
+            count += len(chunk)
+    finally:
+        writer.close()
+    return count
+
+
+def export_to_path(rows, path, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    with open(path, 'wb') as out:
+        return stream_export(rows, out, fmt, chunk_size, columns)
+
+
+# Export into a rewound temporary file, handy for download buttons
+def export_to_tempfile(rows, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE, columns=None):
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    stream_export(rows, out, fmt, chunk_size, columns)
+    out.seek(0)
+    return out
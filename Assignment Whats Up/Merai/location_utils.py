@@ -0,0 +1,181 @@
+# Location lookup with caching and an offline fallback
+# Lookup order: in-memory cache -> on-disk cache -> network (geocoder) -> local gazetteer.
+# Results are (lat, lon, address) tuples, or None when nothing could be found.
+# geocoder is imported on the first network lookup, a cache hit never loads it.
+import csv
+from datetime import datetime, timezone
+import json
+import os
+import threading
+import time
+
+from paths import CACHE_DIR, MODULE_DIR
+
+LOCATION_CACHE_FILE = os.path.join(CACHE_DIR, 'location_cache.json')
+GAZETTEER_FILE = os.path.join(MODULE_DIR, 'gazetteer.csv')
+# IP lookups go stale when the machine moves, place names practically never do
+IP_CACHE_MAX_AGE = 24 * 3600
+PLACE_CACHE_MAX_AGE = 365 * 24 * 3600
+# How long an offline fallback answers before the network is tried again
+OFFLINE_RETRY_AGE = 300
+# Used for 'me' when offline and nothing was ever cached
+DEFAULT_PLACE = os.environ.get('MERAI_DEFAULT_PLACE', 'Hamburg')
+
+# key -> (expires, (lat, lon, address)), same lifetimes as the disk cache
+_memory_cache = {}
+_disk_cache = None
+_gazetteer = None
+_lock = threading.Lock()
+
+
+def _load_disk_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        try:
+            with open(LOCATION_CACHE_FILE, 'r', encoding='utf-8') as f:
+                _disk_cache = json.load(f)
+        except (OSError, ValueError):
+            _disk_cache = {}
+    return _disk_cache
+
+
+def _save_disk_cache():
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = LOCATION_CACHE_FILE + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_disk_cache, f, indent=1)
+        os.replace(tmp_path, LOCATION_CACHE_FILE)
+    except OSError as e:
+        print(f"[WARN] Could not write location cache: {e}")
+
+
+def load_gazetteer(path=GAZETTEER_FILE):
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = {}
+        if os.path.exists(path):
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    _gazetteer[row['name'].strip().lower()] = (
+                        float(row['lat']), float(row['lon']), f"{row['name']}, {row['country']}")
+    return _gazetteer
+
+
+def _cache_get(key, max_age, allow_stale=False):
+    now = time.time()
+    if key in _memory_cache:
+        expires, result = _memory_cache[key]
+        if allow_stale or now < expires:
+            return result
+    entry = _load_disk_cache().get(key)
+    if entry and (allow_stale or now - entry['time'] < max_age):
+        result = (entry['lat'], entry['lon'], entry['address'])
+        _memory_cache[key] = (entry['time'] + max_age, result)
+        return result
+    return None
+
+
+def _cache_put(key, result, max_age):
+    _memory_cache[key] = (time.time() + max_age, result)
+    lat, lon, address = result
+    _load_disk_cache()[key] = {'lat': lat, 'lon': lon, 'address': address, 'time': time.time()}
+    _save_disk_cache()
+
+
+def _geocoder_result(g):
+    if g.ok and g.latlng:
+        lat, lon = g.latlng
+        address = g.city + ", " + g.country if g.city and g.country else "Unknown location"
+        return lat, lon, address
+    return None
+
+
+# Location of an IP address ('me' = this machine's public IP)
+def resolve_ip_location(ip='me'):
+    key = f"ip:{ip}"
+    with _lock:
+        result = _cache_get(key, IP_CACHE_MAX_AGE)
+        if result:
+            return result
+        try:
+            import geocoder
+            result = _geocoder_result(geocoder.ip(ip))
+        except Exception:
+            result = None
+        if result:
+            _cache_put(key, result, IP_CACHE_MAX_AGE)
+            return result
+        # Offline: an old lookup is better than nothing, then the default place
+        result = _cache_get(key, IP_CACHE_MAX_AGE, allow_stale=True)
+        if result is None and ip == 'me':
+            result = load_gazetteer().get(DEFAULT_PLACE.lower())
+        if result:
+            # Remember the fallback for this process only and briefly, so we do not retry the
+            # network on every rerun but pick up a real lookup once it is back
+            _memory_cache[key] = (time.time() + OFFLINE_RETRY_AGE, result)
+        return result
+
+
+# Location of a place name, the local gazetteer answers before any network lookup
+def resolve_place(name):
+    key = f"place:{name.strip().lower()}"
+    with _lock:
+        result = _cache_get(key, PLACE_CACHE_MAX_AGE)
+        if result:
+            return result
+        result = load_gazetteer().get(name.strip().lower())
+        if result:
+            _memory_cache[key] = (time.time() + PLACE_CACHE_MAX_AGE, result)
+            return result
+        try:
+            import geocoder
+            result = _geocoder_result(geocoder.osm(name))
+        except Exception:
+            result = None
+        if result:
+            _cache_put(key, result, PLACE_CACHE_MAX_AGE)
+            return result
+        return _cache_get(key, PLACE_CACHE_MAX_AGE, allow_stale=True)
+
+
+def clear_location_cache(disk=False):
+    global _disk_cache
+    with _lock:
+        _memory_cache.clear()
+        if disk:
+            _disk_cache = {}
+            if os.path.exists(LOCATION_CACHE_FILE):
+                os.remove(LOCATION_CACHE_FILE)
+
+
+# --- Command-line prompts (used when running the astronomy core from a terminal) ---
+
+# Step 1: Get User Location (Working well do not touch )
+def get_user_location():
+    permission = input("Do you allow access to your location? (yes/no): ").strip().lower()
+    if permission != 'yes':
+        print("Location access denied. Exiting.")
+        exit()
+    location = resolve_ip_location()
+    if location:
+        lat, lon, address = location
+        print(f"Detected location: {address} ({lat}, {lon})")
+        return lat, lon, address
+    else:
+        print("Could not determine location.")
+        exit()
+
+
+# Step 1.1: Get User date time or real time (Working well do not touch )
+def get_user_datetime():
+    user_input = input("Enter date and time in YYYY-MM-DD HH:MM (24h, local) or press Enter for now: ").strip()
+    if not user_input:
+        return None  # Use current time
+    try:
+        dt = datetime.strptime(user_input, "%Y-%m-%d %H:%M")
+        dt = dt.replace(tzinfo=timezone.utc)  # Make datetime timezone-aware (UTC)
+        return dt
+    except Exception:
+        print("Invalid format. Using current time.")
+        return None
@@ -0,0 +1,163 @@
+# Star position backend: serial, or sharded over a process pool
+#
+#   python parallel_utils.py --lat 53.55 --lon 9.99 --times 8 --scaling
+#
+# The catalog is memory-mapped from .npy files (catalog_utils.load_catalog_arrays), so
+# workers only receive index ranges. Results are written straight into a shared-memory
+# block, nothing big is pickled in either direction.
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from multiprocessing import shared_memory
+import os
+import time
+
+import numpy as np
+from skyfield.api import Star, Topos
+
+from astro_utils import get_timescale, load_ephemeris
+from catalog_utils import CATALOG_ARRAY_DIR, load_catalog_arrays, magnitude_prefix
+
+BACKENDS = ('serial', 'process')
+# Default backend for callers that do not choose one (get_visible_objects, sky view)
+DEFAULT_BACKEND = os.environ.get('MERAI_STAR_BACKEND', 'serial')
+MIN_CHUNK = 2000
+
+_pools = {}
+
+
+def _init_worker(array_dir):
+    load_ephemeris()
+    get_timescale()
+    load_catalog_arrays(array_dir)
+
+
+def get_pool(workers):
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                              initargs=(CATALOG_ARRAY_DIR,))
+    return _pools[workers]
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+# Fill out[0] (altitude) and out[1] (azimuth), shape (2, n_times, n_stars), for stars start:stop
+def _compute_range(out, array_dir, start, stop, lat, lon, tt_jds):
+    arrays = load_catalog_arrays(array_dir)
+    sl = slice(start, stop)
+    star = Star(ra_hours=np.asarray(arrays['ra_hours'][sl]),
+                dec_degrees=np.asarray(arrays['dec_degrees'][sl]),
+                ra_mas_per_year=np.asarray(arrays['ra_mas_per_year'][sl]),
+                dec_mas_per_year=np.asarray(arrays['dec_mas_per_year'][sl]),
+                parallax_mas=np.asarray(arrays['parallax_mas'][sl]),
+                epoch=1721045.0 + np.asarray(arrays['epoch_year'][sl]) * 365.25)
+    ts = get_timescale()
+    observer = load_ephemeris()['earth'] + Topos(latitude_degrees=lat, longitude_degrees=lon)
+    for i, jd in enumerate(tt_jds):
+        alt, az, _ = observer.at(ts.tt_jd(jd)).observe(star).apparent().altaz()
+        out[0, i, sl] = alt.degrees
+        out[1, i, sl] = az.degrees
+
+
+def _worker_task(shm_name, shape, array_dir, start, stop, lat, lon, tt_jds):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        _compute_range(out, array_dir, start, stop, lat, lon, tt_jds)
+        del out
+    finally:
+        shm.close()
+    return stop - start
+
+
+def _chunk_bounds(n_stars, workers, chunk_size):
+    if chunk_size is None:
+        # A few chunks per worker keeps the pool busy when chunks finish unevenly
+        chunk_size = max(MIN_CHUNK, -(-n_stars // (workers * 4)))
+    return [(s, min(s + chunk_size, n_stars)) for s in range(0, n_stars, chunk_size)]
+
+
+# Alt/az of all stars brighter than mag_limit at each time in `times` (skyfield Time,
+# scalar or array) for one observer. Returns hip, magnitude (n_stars,) and altitude,
+# azimuth (n_times, n_stars) float32 arrays.
+def star_altaz_table(lat, lon, times, mag_limit=None, backend=None, workers=None, chunk_size=None,
+                     array_dir=CATALOG_ARRAY_DIR):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown star backend '{backend}', choose one of {BACKENDS}")
+    arrays = load_catalog_arrays(array_dir)
+    n_stars = magnitude_prefix(arrays, mag_limit)
+    tt_jds = np.atleast_1d(times.tt)
+    shape = (2, len(tt_jds), n_stars)
+    result = {'hip': np.asarray(arrays['hip'][:n_stars]), 'magnitude': np.asarray(arrays['magnitude'][:n_stars])}
+    if backend == 'serial' or n_stars == 0:
+        out = np.empty(shape, dtype=np.float32)
+        if n_stars:
+            _compute_range(out, array_dir, 0, n_stars, lat, lon, tt_jds)
+        result['altitude'], result['azimuth'] = out[0], out[1]
+        return result
+    workers = workers or os.cpu_count()
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+    try:
+        pool = get_pool(workers)
+        futures = [pool.submit(_worker_task, shm.name, shape, array_dir, start, stop, lat, lon, tt_jds)
+                   for start, stop in _chunk_bounds(n_stars, workers, chunk_size)]
+        for future in futures:
+            future.result()
+        out = np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    result['altitude'], result['azimuth'] = out[0], out[1]
+    return result
+
+
+# Time the serial backend against the process backend for several worker counts
+def measure_scaling(lat, lon, times, mag_limit=None, worker_counts=None):
+    worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count() or 1})
+    star_altaz_table(lat, lon, times[:1], mag_limit, 'serial')  # warm up catalog + ephemeris
+    started = time.perf_counter()
+    star_altaz_table(lat, lon, times, mag_limit, 'serial')
+    serial = time.perf_counter() - started
+    rows = [('serial', serial, 1.0, 1.0)]
+    for workers in worker_counts:
+        star_altaz_table(lat, lon, times[:1], mag_limit, 'process', workers)  # spawn the pool
+        started = time.perf_counter()
+        star_altaz_table(lat, lon, times, mag_limit, 'process', workers)
+        elapsed = time.perf_counter() - started
+        rows.append((f"process x{workers}", elapsed, serial / elapsed, serial / elapsed / workers))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate catalog star positions, optionally on a process pool")
+    parser.add_argument('--lat', type=float, default=53.55)
+    parser.add_argument('--lon', type=float, default=9.99)
+    parser.add_argument('--times', type=int, default=4, help='number of hourly time steps')
+    parser.add_argument('--mag-limit', type=float, default=None)
+    parser.add_argument('--backend', choices=BACKENDS, default='process')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--scaling', action='store_true', help='report speed-up per worker count')
+    args = parser.parse_args()
+    start = datetime.now(timezone.utc)
+    times = get_timescale().from_datetimes([start + timedelta(hours=h) for h in range(args.times)])
+    if args.scaling:
+        print(f"{'backend':<14}{'seconds':>10}{'speed-up':>10}{'efficiency':>12}")
+        for name, seconds, speedup, efficiency in measure_scaling(args.lat, args.lon, times, args.mag_limit):
+            print(f"{name:<14}{seconds:>10.2f}{speedup:>10.2f}{efficiency:>12.0%}")
+    else:
+        started = time.perf_counter()
+        table = star_altaz_table(args.lat, args.lon, times, args.mag_limit, args.backend, args.workers)
+        elapsed = time.perf_counter() - started
+        n_stars = len(table['hip'])
+        print(f"[INFO] {n_stars} stars x {args.times} times in {elapsed:.2f}s "
+              f"({n_stars * args.times / elapsed:,.0f} positions/s, backend={args.backend})")
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
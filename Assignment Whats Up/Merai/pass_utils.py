@@ -0,0 +1,248 @@
+# Satellite pass prediction: rise, culmination and set over the next hours
+#
+#   python pass_utils.py --lat 53.55 --lon 9.99 --hours 24 --visible-only
+#   python pass_utils.py --tle-file active.txt --hours 24 --workers 8
+#
+# Satellites that can never reach the mask are dropped first (prefilter_utils); the rest
+# are propagated on a coarse time grid (COARSE_STEP_MINUTES), but only inside their
+# geometric pass windows. Passes are the runs of grid samples above the elevation mask.
+# Only then are the events refined: rise and set by bisection on altitude - mask,
+# culmination by bisection on the sign of the altitude rate. Chunks run on a process pool.
+# Workers receive the compact element records (tle_store) and the Sun's direction on the
+# grid, so nothing big is pickled in either direction.
+#
+# A pass is 'visible' when, at some grid sample above the mask, the satellite is sunlit
+# (outside Earth's cylindrical shadow) while the Sun is below TWILIGHT_SUN_ALTITUDE for the
+# observer. It is 'daylight' when the observer is never in darkness during the pass and
+# 'eclipsed' otherwise. Passes shorter than one grid step above the mask can be missed.
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import repeat
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sgp4.api import SatrecArray
+
+from almanac_utils import bisect_roots
+from astro_utils import get_timescale
+from prefilter_utils import can_ever_be_visible, pass_windows
+from satellite_utils import DEFAULT_MIN_ALTITUDE, propagate_itrs, sgp4_times, teme_to_itrs, topocentric_altaz
+from tle_store import load_elements, satrecs_from_elements
+
+COARSE_STEP_MINUTES = 1.0
+BISECTION_STEPS = 12  # one grid step / 2**12, about 15ms
+RATE_STEP_DAYS = 1.0 / 86400  # half-width of the altitude-rate difference
+TWILIGHT_SUN_ALTITUDE = -6.0  # civil twilight: the sky is dark enough to see a sunlit satellite
+EARTH_RADIUS_KM = 6378.137
+DEFAULT_CHUNK_SIZE = 500
+PASS_COLUMNS = ['name', 'norad', 'rise', 'rise_azimuth', 'culmination', 'max_altitude', 'culmination_azimuth',
+                'set', 'set_azimuth', 'sunlit', 'visibility']
+VISIBILITY = np.array(['daylight', 'eclipsed', 'visible'])
+
+_pools = {}
+
+
+def _init_worker():
+    get_timescale()
+
+
+def get_pool(workers):
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    return _pools[workers]
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+# Outside the cylindrical shadow of the Earth (penumbra ignored); r (..., 3) km, sun_dir unit vectors
+def _sunlit(r, sun_dir):
+    along = np.sum(r * sun_dir, axis=-1)
+    return (along > 0) | (np.linalg.norm(r - along[..., None] * sun_dir, axis=-1) > EARTH_RADIUS_KM)
+
+
+# Alt, az and Earth-fixed position of satellite sats[i] at TT date tt[i], one sgp4_array
+# call per distinct satellite
+def _pair_altaz(satrecs, sats, tt, lat, lon, elevation_m):
+    r = np.full((len(tt), 3), np.nan)
+    if not len(tt):
+        return np.empty(0), np.empty(0), r
+    t = get_timescale().tt_jd(tt)
+    jd, fraction = sgp4_times(t)
+    order = np.argsort(sats, kind='stable')
+    for group in np.split(order, np.flatnonzero(np.diff(sats[order])) + 1):
+        errors, r_teme, _ = satrecs[sats[group[0]]].sgp4_array(jd[group], fraction[group])
+        r_teme[errors != 0] = np.nan
+        r[group] = r_teme
+    r_fixed = teme_to_itrs(r, t)
+    alt, az, _ = topocentric_altaz(r_fixed, lat, lon, elevation_m)
+    return alt, az, r_fixed
+
+
+# All passes of one chunk of element records, as arrays (times are TT Julian dates, NaN
+# when the pass is already under way at the start or still running at the end)
+# With prefilter, each satellite is only propagated inside its prefilter_utils.pass_windows.
+def _chunk_passes(elements, lat, lon, elevation_m, tt_grid, sun_dir, dark, min_altitude, prefilter=True):
+    satrecs = satrecs_from_elements(elements)
+    t_grid = get_timescale().tt_jd(tt_grid)
+    if prefilter:
+        windows = pass_windows(elements, lat, lon, t_grid, min_altitude)
+        jd, fraction = sgp4_times(t_grid)
+        r_teme = np.full((len(satrecs), len(tt_grid), 3), np.nan)
+        for i, sat in enumerate(satrecs):
+            idx = np.flatnonzero(windows[i])
+            if len(idx):
+                errors, r_teme[i, idx], _ = sat.sgp4_array(jd[idx], fraction[idx])
+                r_teme[i, idx[errors != 0]] = np.nan
+        r = teme_to_itrs(r_teme, t_grid)
+        alt, _, _ = topocentric_altaz(r, lat, lon, elevation_m)
+    else:
+        r, errors = propagate_itrs({'array': SatrecArray(satrecs)}, t_grid)
+        alt, _, _ = topocentric_altaz(r, lat, lon, elevation_m)
+        alt[errors != 0] = np.nan
+    above = alt > min_altitude
+    n_times = len(tt_grid)
+    edges = np.diff(np.pad(above, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    sats, start = np.nonzero(edges == 1)
+    _, end = np.nonzero(edges == -1)  # row-major, so ends pair up with starts
+    # Visibility from running counts of "sunlit and dark" samples along each satellite's track
+    seen = np.pad(np.cumsum(above & _sunlit(r, sun_dir[None]) & dark[None], axis=1), ((0, 0), (1, 0)))
+    dark_count = np.pad(np.cumsum(dark), (1, 0))
+    visibility = np.where(seen[sats, end] > seen[sats, start], 2,
+                          np.where(dark_count[end] > dark_count[start], 1, 0))
+    peak = np.array([s + np.argmax(alt[i, s:e]) for i, s, e in zip(sats, start, end)], dtype=int)
+
+    rises = np.flatnonzero(start > 0)
+    sets = np.flatnonzero(end < n_times)
+    # The grid maximum brackets the culmination unless it sits on the edge of the window
+    peaks = np.flatnonzero((peak > 0) & (peak < n_times - 1))
+    # All brackets are refined together, one _pair_altaz call per bisection step: crossings
+    # first (altitude - mask), then culminations (altitude one second later minus earlier)
+    n_crossings = len(rises) + len(sets)
+    bracket_sats = sats[np.concatenate([rises, sets, peaks, peaks])]
+
+    def f(tt):
+        at = np.concatenate([tt[:n_crossings], tt[n_crossings:] + RATE_STEP_DAYS, tt[n_crossings:] - RATE_STEP_DAYS])
+        alt = _pair_altaz(satrecs, bracket_sats, at, lat, lon, elevation_m)[0]
+        later, earlier = np.split(alt[n_crossings:], 2)
+        return np.concatenate([alt[:n_crossings] - min_altitude, later - earlier])
+
+    roots = bisect_roots(f, np.concatenate([tt_grid[start[rises] - 1], tt_grid[end[sets] - 1], tt_grid[peak[peaks] - 1]]),
+                         np.concatenate([tt_grid[start[rises]], tt_grid[end[sets]], tt_grid[peak[peaks] + 1]]),
+                         BISECTION_STEPS)
+    rise_tt, set_tt = np.full(len(sats), np.nan), np.full(len(sats), np.nan)
+    rise_tt[rises], set_tt[sets] = roots[:len(rises)], roots[len(rises):n_crossings]
+    culmination_tt = tt_grid[peak].astype(float)
+    culmination_tt[peaks] = roots[n_crossings:]
+    events = _pair_altaz(satrecs, np.concatenate([sats, sats, sats]),
+                         np.concatenate([np.nan_to_num(rise_tt, nan=tt_grid[0]), culmination_tt,
+                                         np.nan_to_num(set_tt, nan=tt_grid[-1])]), lat, lon, elevation_m)
+    (_, max_alt, _), (rise_az, culmination_az, set_az) = np.split(events[0], 3), np.split(events[1], 3)
+    r_peak = np.split(events[2], 3)[1]
+    sun_at_peak = np.stack([np.interp(culmination_tt, tt_grid, sun_dir[:, k]) for k in range(3)], axis=-1)
+    sun_at_peak /= np.linalg.norm(sun_at_peak, axis=-1, keepdims=True)
+    return {'index': sats, 'rise': rise_tt, 'rise_azimuth': np.where(np.isnan(rise_tt), np.nan, rise_az),
+            'culmination': culmination_tt, 'max_altitude': max_alt, 'culmination_azimuth': culmination_az,
+            'set': set_tt, 'set_azimuth': np.where(np.isnan(set_tt), np.nan, set_az),
+            'sunlit': _sunlit(r_peak, sun_at_peak), 'visibility': visibility}
+
+
+def _timestamps(tt):
+    out = pd.Series(pd.NaT, index=range(len(tt)), dtype='datetime64[ns, UTC]')
+    known = ~np.isnan(tt)
+    if known.any():
+        out[known] = pd.to_datetime(get_timescale().tt_jd(tt[known]).utc_datetime(), utc=True)
+    return out.dt.round('s')
+
+
+# Passes of every satellite in `elements` (tle_store records; default: the whole store) over
+# `hours` from `start` (aware datetime, default now) for one observer, as a DataFrame of
+# PASS_COLUMNS sorted by culmination. Times are UTC, angles degrees. prefilter drops
+# satellites that can never reach the mask at this latitude and skips propagation outside
+# each satellite's pass windows (prefilter_utils).
+def predict_passes(lat, lon, start=None, hours=24, elements=None, min_altitude=DEFAULT_MIN_ALTITUDE,
+                   elevation_m=0.0, step_minutes=COARSE_STEP_MINUTES, backend='process', workers=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE, prefilter=True):
+    from planet_utils import BODY_NAMES, geocentric_positions, planet_altaz_table
+    elements = load_elements() if elements is None else elements
+    if prefilter:
+        elements = elements[can_ever_be_visible(elements, lat, min_altitude)]
+    ts = get_timescale()
+    t0 = ts.from_datetime(start or datetime.now(timezone.utc))
+    tt_grid = t0.tt + np.arange(0, hours * 60 + step_minutes, step_minutes) / 1440.0
+    t = ts.tt_jd(tt_grid)
+    # Sun direction, Earth-fixed like the satellites, and the observer's darkness on the grid
+    sun = BODY_NAMES.index('Sun')
+    x, y, z = geocentric_positions(tt_grid)[sun]
+    gast = np.radians(t.gast * 15.0)
+    sun_dir = np.stack([np.cos(gast) * x + np.sin(gast) * y, -np.sin(gast) * x + np.cos(gast) * y, z], axis=-1)
+    sun_dir /= np.linalg.norm(sun_dir, axis=-1, keepdims=True)
+    dark = planet_altaz_table(lat, lon, t)[0][sun] < TWILIGHT_SUN_ALTITUDE
+    chunks = [elements[s:s + chunk_size] for s in range(0, len(elements), chunk_size)]
+    args = (lat, lon, elevation_m, tt_grid, sun_dir, dark, min_altitude, prefilter)
+    if backend == 'serial' or len(chunks) <= 1:
+        results = [_chunk_passes(chunk, *args) for chunk in chunks]
+    else:
+        pool = get_pool(workers or os.cpu_count())
+        results = list(pool.map(_chunk_passes, chunks, *(repeat(a) for a in args)))
+    offsets = np.cumsum([0] + [len(chunk) for chunk in chunks])
+    merged = {key: np.concatenate([r[key] for r in results]) if results else np.empty(0)
+              for key in ('rise', 'rise_azimuth', 'culmination', 'max_altitude', 'culmination_azimuth',
+                          'set', 'set_azimuth', 'sunlit', 'visibility')}
+    index = np.concatenate([r['index'] + offset for r, offset in zip(results, offsets)]) if results \
+        else np.empty(0, dtype=int)
+    table = pd.DataFrame({
+        'name': elements['name'][index],
+        'norad': elements['norad'][index],
+        'rise': _timestamps(merged['rise']),
+        'rise_azimuth': np.round(merged['rise_azimuth'], 1),
+        'culmination': _timestamps(merged['culmination']),
+        'max_altitude': np.round(merged['max_altitude'], 1),
+        'culmination_azimuth': np.round(merged['culmination_azimuth'], 1),
+        'set': _timestamps(merged['set']),
+        'set_azimuth': np.round(merged['set_azimuth'], 1),
+        'sunlit': merged['sunlit'].astype(bool),
+        'visibility': VISIBILITY[merged['visibility'].astype(int)],
+    })
+    return table[PASS_COLUMNS].sort_values('culmination', ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upcoming satellite passes for one site")
+    parser.add_argument('--lat', type=float, default=53.55)
+    parser.add_argument('--lon', type=float, default=9.99)
+    parser.add_argument('--start', type=datetime.fromisoformat, default=None, help='UTC start, ISO 8601')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--tle-file', help='ingest this TLE file into the store first')
+    parser.add_argument('--min-altitude', type=float, default=DEFAULT_MIN_ALTITUDE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--serial', action='store_true', help='no process pool')
+    parser.add_argument('--visible-only', action='store_true')
+    parser.add_argument('--no-prefilter', action='store_true', help='propagate every satellite at every step')
+    args = parser.parse_args()
+    if args.tle_file:
+        from tle_store import ingest_tle_files
+        ingest_tle_files([args.tle_file])
+    start = args.start.replace(tzinfo=args.start.tzinfo or timezone.utc) if args.start else None
+    elements = load_elements()
+    started = time.perf_counter()
+    table = predict_passes(args.lat, args.lon, start, args.hours, elements, args.min_altitude,
+                           backend='serial' if args.serial else 'process', workers=args.workers,
+                           prefilter=not args.no_prefilter)
+    print(f"[INFO] {len(table)} passes of {len(elements)} satellites over {args.hours:g}h "
+          f"in {time.perf_counter() - started:.2f}s")
+    if args.visible_only:
+        table = table[table['visibility'] == 'visible']
+    with pd.option_context('display.max_rows', 100, 'display.width', 160):
+        print(table)
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
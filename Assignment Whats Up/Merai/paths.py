@@ -0,0 +1,7 @@
+# Shared locations: the directory holding the app's data files and the writable cache
+# directory (MERAI_CACHE_DIR, default ./cache next to this file). Every module that keeps
+# files on disk builds its paths from these two.
+import os
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('MERAI_CACHE_DIR', os.path.join(MODULE_DIR, 'cache'))
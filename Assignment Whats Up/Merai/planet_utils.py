@@ -0,0 +1,143 @@
+# Planet engine: Sun, Moon and planets from per-day Chebyshev tables
+#
+#   python planet_utils.py --validate     # compare against full skyfield for random times/sites
+#
+# For each (TT) day the apparent geocentric position of every body in SOLAR_SYSTEM_BODIES
+# (true equator and equinox of date, au) is sampled at Chebyshev nodes and fitted once.
+# Any time in that day is then a polynomial evaluation, and any observer is just the
+# topocentric shift and a rotation by local sidereal time. There are no observe()/apparent()
+# calls per query. The only approximation is diurnal aberration, well under an arcsecond.
+import argparse
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import time
+
+import numpy as np
+from numpy.polynomial import chebyshev
+from skyfield.framelib import true_equator_and_equinox_of_date
+
+from astro_utils import SOLAR_SYSTEM_BODIES, get_timescale, load_ephemeris
+
+BODY_NAMES = tuple(SOLAR_SYSTEM_BODIES)
+# Degree 16 over one day fits even the Moon, the fastest body, to about 0.01 milliarcseconds
+TABLE_DEGREE = 16
+TABLE_CACHE_DAYS = 64
+# WGS84, the ellipsoid skyfield's Topos uses
+EARTH_RADIUS_AU = 6378.137 / 149597870.700
+EARTH_FLATTENING = 1 / 298.257223563
+
+_tables = OrderedDict()
+
+
+# Chebyshev coefficients, shape (n_bodies, 3, TABLE_DEGREE + 1), for TT day [day, day + 1)
+def day_table(day):
+    if day in _tables:
+        _tables.move_to_end(day)
+        return _tables[day]
+    nodes = np.cos(np.pi * (np.arange(TABLE_DEGREE + 1) + 0.5) / (TABLE_DEGREE + 1))  # in [-1, 1]
+    t = get_timescale().tt_jd(day + 0.5 + nodes / 2)
+    eph = load_ephemeris()
+    earth_at = eph['earth'].at(t)
+    coeffs = np.empty((len(BODY_NAMES), 3, TABLE_DEGREE + 1))
+    for i, (key, _) in enumerate(SOLAR_SYSTEM_BODIES.values()):
+        xyz = earth_at.observe(eph[key]).apparent().frame_xyz(true_equator_and_equinox_of_date).au
+        for axis in range(3):
+            coeffs[i, axis] = chebyshev.chebfit(nodes, xyz[axis], TABLE_DEGREE)
+    _tables[day] = coeffs
+    if len(_tables) > TABLE_CACHE_DAYS:
+        _tables.popitem(last=False)
+    return coeffs
+
+
+# Apparent geocentric xyz (au, true equator of date), shape (n_bodies, 3, n_times)
+def geocentric_positions(tt_jds):
+    tt_jds = np.atleast_1d(tt_jds)
+    days = np.floor(tt_jds)
+    out = np.empty((len(BODY_NAMES), 3, len(tt_jds)))
+    for day in np.unique(days):
+        mask = days == day
+        x = 2 * (tt_jds[mask] - day) - 1
+        out[:, :, mask] = chebyshev.chebval(x, day_table(day).transpose(2, 0, 1))
+    return out
+
+
+def _observer_xyz(lat, lon, last_radians):
+    # Geodetic site on the WGS84 ellipsoid, rotated by local apparent sidereal time
+    phi = np.radians(lat)
+    e2 = EARTH_FLATTENING * (2 - EARTH_FLATTENING)
+    n = EARTH_RADIUS_AU / np.sqrt(1 - e2 * np.sin(phi) ** 2)
+    return np.array([n * np.cos(phi) * np.cos(last_radians),
+                     n * np.cos(phi) * np.sin(last_radians),
+                     np.broadcast_to(n * (1 - e2) * np.sin(phi), np.shape(last_radians))])
+
+
+# Altitude and azimuth in degrees of every body for one observer at skyfield Time t
+# (scalar or array). Both have shape (n_bodies,) or (n_bodies, n_times).
+def planet_altaz_table(lat, lon, t):
+    scalar = np.ndim(t.tt) == 0
+    last = np.radians(np.atleast_1d(t.gast) * 15.0 + lon)
+    xyz = geocentric_positions(t.tt) - _observer_xyz(lat, lon, last)[None]
+    ra = np.arctan2(xyz[:, 1], xyz[:, 0])
+    dec = np.arctan2(xyz[:, 2], np.hypot(xyz[:, 0], xyz[:, 1]))
+    ha = last - ra
+    phi = np.radians(lat)
+    alt = np.degrees(np.arcsin(np.sin(phi) * np.sin(dec) + np.cos(phi) * np.cos(dec) * np.cos(ha)))
+    az = np.degrees(np.arctan2(-np.cos(dec) * np.sin(ha),
+                               np.sin(dec) * np.cos(phi) - np.cos(dec) * np.sin(phi) * np.cos(ha))) % 360.0
+    if scalar:
+        return alt[:, 0], az[:, 0]
+    return alt, az
+
+
+# (name, type, altitude, azimuth) for every body, same shape as astro_utils.get_planet_altaz
+def get_planet_positions(lat, lon, t):
+    alt, az = planet_altaz_table(lat, lon, t)
+    return [(name, SOLAR_SYSTEM_BODIES[name][1], float(alt[i]), float(az[i])) for i, name in enumerate(BODY_NAMES)]
+
+
+# Largest table error (arcsec of great-circle separation) per body, over random times within
+# `days` of `start` and random sites, measured against skyfield's full observe().apparent()
+def validate_planet_tables(samples=200, days=30, start=None, seed=0):
+    from skyfield.api import Topos
+    rng = np.random.default_rng(seed)
+    start = start or datetime.now(timezone.utc)
+    ts = get_timescale()
+    eph = load_ephemeris()
+    worst = dict.fromkeys(BODY_NAMES, 0.0)
+    for _ in range(samples):
+        lat, lon = rng.uniform(-80, 80), rng.uniform(-180, 180)
+        t = ts.from_datetime(start + timedelta(days=float(rng.uniform(0, days))))
+        alt, az = planet_altaz_table(lat, lon, t)
+        observer_at = (eph['earth'] + Topos(latitude_degrees=lat, longitude_degrees=lon)).at(t)
+        for i, (name, (key, _)) in enumerate(SOLAR_SYSTEM_BODIES.items()):
+            ref_alt, ref_az, _ = observer_at.observe(eph[key]).apparent().altaz()
+            a1, a2 = np.radians(alt[i]), ref_alt.radians
+            cos_sep = np.sin(a1) * np.sin(a2) + np.cos(a1) * np.cos(a2) * np.cos(np.radians(az[i]) - ref_az.radians)
+            worst[name] = max(worst[name], np.degrees(np.arccos(min(1.0, cos_sep))) * 3600)
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chebyshev planet tables: timing and accuracy check")
+    parser.add_argument('--validate', action='store_true', help='compare with full skyfield positions')
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+    ts = get_timescale()
+    t = ts.now()
+    started = time.perf_counter()
+    planet_altaz_table(53.55, 9.99, t)
+    built = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(100):
+        planet_altaz_table(53.55, 9.99, ts.now())
+    print(f"[INFO] Day table built in {built * 1000:.1f}ms, "
+          f"then {(time.perf_counter() - started) * 10:.2f}ms per query for {len(BODY_NAMES)} bodies")
+    if args.validate:
+        print(f"{'body':<10}{'max error':>12}")
+        for name, arcsec in validate_planet_tables(args.samples, args.days).items():
+            print(f"{name:<10}{arcsec:>10.3f}\"")
+
+
+if __name__ == "__main__":
+    main()
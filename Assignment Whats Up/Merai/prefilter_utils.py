@@ -0,0 +1,129 @@
+# Geometric satellite prefilter: drop satellites that cannot be above the mask, before SGP4
+#
+#   python prefilter_utils.py --lat 53.55 --lon 9.99 --hours 24
+#
+# Works on the mean elements alone (tle_store records), no propagation:
+#  - reach: from apogee height and the elevation mask, the largest Earth-central angle between
+#    observer and sub-satellite point at which the satellite can be above the mask.
+#  - latitude: the ground track never leaves |latitude| <= inclination (180 - i if
+#    retrograde), so observers further than `reach` from that band never see it.
+#  - time windows: the satellite is always in its orbital plane, so it can only be seen
+#    while the observer (turning with the Earth) is within `reach` of that plane. The plane
+#    only moves by J2 nodal precession, which is cheap and does not suffer from along-track
+#    drag errors of older element sets.
+# Both tests are conservative (apogee height, plus a margin for the ellipsoid and the
+# element set's age), so they never drop a satellite SGP4 would have put above the mask.
+import argparse
+from datetime import datetime, timedelta, timezone
+import time
+
+import numpy as np
+from skyfield.sgp4lib import theta_GMST1982
+
+from astro_utils import get_timescale
+from satellite_utils import DEFAULT_MIN_ALTITUDE
+
+# WGS72, the constants SGP4 runs on
+EARTH_RADIUS_KM = 6378.135
+EARTH_MU = 398600.8  # km^3/s^2
+EARTH_J2 = 0.001082616
+# Extra angle (degrees) on top of the geometric reach: geodetic vs geocentric latitude, the
+# flattened Earth and slightly stale elements
+REACH_MARGIN_DEG = 2.0
+
+
+# Earth-central angle (degrees) out to which a satellite at height_km is above min_altitude
+def reach_angle(height_km, min_altitude=DEFAULT_MIN_ALTITUDE):
+    e = np.radians(min_altitude)
+    ratio = EARTH_RADIUS_KM * np.cos(e) / (EARTH_RADIUS_KM + np.maximum(height_km, 0.0))
+    return np.degrees(np.arccos(np.clip(ratio, -1, 1)) - e)
+
+
+# Orbit size and orientation derived from the elements, arrays of shape (n_sats,)
+def orbit_geometry(elements):
+    n = elements['no_kozai'] / 60.0  # rad/s
+    a = (EARTH_MU / n ** 2) ** (1 / 3)
+    e, i = elements['ecco'], elements['inclo']
+    p = a * (1 - e ** 2)
+    return {
+        'semi_major_km': a,
+        'apogee_km': a * (1 + e) - EARTH_RADIUS_KM,
+        'perigee_km': a * (1 - e) - EARTH_RADIUS_KM,
+        'inclination': np.degrees(i),
+        # J2 secular drift of the ascending node, rad/day
+        'node_rate': -1.5 * elements['no_kozai'] * 1440.0 * EARTH_J2 * (EARTH_RADIUS_KM / p) ** 2 * np.cos(i),
+    }
+
+
+# True where a satellite can ever rise above min_altitude for an observer at latitude lat
+# (scalar, or an array of sites: result shape (n_sats, n_sites))
+def can_ever_be_visible(elements, lat, min_altitude=DEFAULT_MIN_ALTITUDE):
+    geometry = orbit_geometry(elements)
+    band = np.minimum(geometry['inclination'], 180.0 - geometry['inclination'])
+    limit = band + reach_angle(geometry['apogee_km'], min_altitude) + REACH_MARGIN_DEG
+    lat = np.asarray(lat, dtype=float)
+    return np.abs(lat) <= (limit[:, None] if lat.ndim else limit)
+
+
+# True where the observer is within reach of the satellite's orbital plane at time t
+# (skyfield Time, scalar or array): shape (n_sats, n_times). A satellite can only be above
+# the mask while this holds; pad=k also opens the k samples either side of each window.
+def pass_windows(elements, lat, lon, t, min_altitude=DEFAULT_MIN_ALTITUDE, pad=1):
+    geometry = orbit_geometry(elements)
+    jd = np.atleast_1d(t.ut1)
+    theta, _ = theta_GMST1982(np.atleast_1d(t.whole), np.atleast_1d(t.ut1_fraction))
+    node = elements['nodeo'][:, None] + geometry['node_rate'][:, None] * (jd[None] - elements['epoch_jd'][:, None])
+    incl = elements['inclo'][:, None]
+    phi, ra = np.radians(lat), theta[None] + np.radians(lon)
+    # Orbit normal dotted with the observer's direction, both in the TEME frame
+    sin_distance = (np.sin(incl) * np.sin(node) * np.cos(phi) * np.cos(ra)
+                    - np.sin(incl) * np.cos(node) * np.cos(phi) * np.sin(ra)
+                    + np.cos(incl) * np.sin(phi))
+    reach = np.radians(reach_angle(geometry['apogee_km'], min_altitude) + REACH_MARGIN_DEG)
+    windows = np.abs(np.arcsin(np.clip(sin_distance, -1, 1))) <= reach[:, None]
+    for _ in range(pad):
+        windows[:, 1:] |= windows[:, :-1].copy()
+        windows[:, :-1] |= windows[:, 1:].copy()
+    return windows
+
+
+# (start, stop) index ranges of the True runs in one row of pass_windows
+def window_intervals(row):
+    edges = np.diff(np.concatenate([[0], row.astype(np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+# How much propagation the prefilter saves for one site over a time grid
+def prefilter_report(elements, lat, lon, t, min_altitude=DEFAULT_MIN_ALTITUDE):
+    reachable = can_ever_be_visible(elements, lat, min_altitude)
+    windows = pass_windows(elements[reachable], lat, lon, t, min_altitude)
+    n_times = len(np.atleast_1d(t.tt))
+    return {'satellites': len(elements), 'reachable': int(reachable.sum()),
+            'window_fraction': float(windows.mean()) if windows.size else 0.0,
+            'propagations': int(windows.sum()), 'propagations_unfiltered': len(elements) * n_times}
+
+
+def main():
+    from tle_store import load_elements
+    parser = argparse.ArgumentParser(description="How many satellites/time steps the geometric prefilter keeps")
+    parser.add_argument('--lat', type=float, default=53.55)
+    parser.add_argument('--lon', type=float, default=9.99)
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--step-minutes', type=float, default=1.0)
+    parser.add_argument('--min-altitude', type=float, default=DEFAULT_MIN_ALTITUDE)
+    args = parser.parse_args()
+    elements = load_elements()
+    start = datetime.now(timezone.utc)
+    t = get_timescale().from_datetimes([start + timedelta(minutes=m)
+                                        for m in np.arange(0, args.hours * 60, args.step_minutes)])
+    started = time.perf_counter()
+    report = prefilter_report(elements, args.lat, args.lon, t, args.min_altitude)
+    elapsed = time.perf_counter() - started
+    print(f"[INFO] {report['reachable']} of {report['satellites']} satellites can reach "
+          f"{args.min_altitude:g}° at latitude {args.lat:g}")
+    print(f"[INFO] {report['propagations']:,} of {report['propagations_unfiltered']:,} propagations left "
+          f"({report['window_fraction']:.0%} of the reachable satellites' time steps), {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Lightweight stage timing for the Merai pipeline
+#
+#   with span('star_loop'):
+#       ...
+#
+# Off by default: span() then hands back one shared no-op context manager, so the
+# instrumentation costs a function call and a flag check. MERAI_PROFILE=1 turns it on for
+# every thread of the process; enable_profiling() turns it on or off for the calling thread
+# only (one Streamlit session run, one API request). Spans are kept per thread as well, so
+# concurrent sessions do not mix. Memory deltas need tracemalloc, which is process-wide:
+# it is only started by MERAI_PROFILE_MEMORY=1, never by enable_profiling().
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Process-wide defaults, from the environment only
+_default_enabled = os.environ.get('MERAI_PROFILE') == '1'
+_NULL_SPAN = nullcontext()
+_local = threading.local()
+if os.environ.get('MERAI_PROFILE_MEMORY') == '1':
+    tracemalloc.start()
+
+
+def profiling_enabled():
+    return getattr(_local, 'enabled', _default_enabled)
+
+
+def memory_profiling_available():
+    return tracemalloc.is_tracing()
+
+
+def _memory_tracked():
+    return getattr(_local, 'track_memory', _default_enabled and tracemalloc.is_tracing())
+
+
+# Profiling on or off for the calling thread; memory deltas only when tracemalloc is running
+def enable_profiling(enabled=True, memory=False):
+    _local.enabled = enabled
+    _local.track_memory = enabled and memory and tracemalloc.is_tracing()
+
+
+def _state():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+        _local.spans = []
+    return _local
+
+
+@contextmanager
+def _record(name):
+    state = _state()
+    path = state.stack + [name]
+    state.stack.append(name)
+    track_memory = _memory_tracked()
+    mem_start = tracemalloc.get_traced_memory()[0] if track_memory else 0
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter_ns()
+        mem_delta = tracemalloc.get_traced_memory()[0] - mem_start if track_memory else 0
+        state.stack.pop()
+        state.spans.append({'name': name, 'path': ';'.join(path), 'start_ns': started,
+                            'duration_ns': ended - started, 'mem_delta': mem_delta,
+                            'thread': threading.get_ident()})
+
+
+def span(name):
+    if not profiling_enabled():
+        return _NULL_SPAN
+    return _record(name)
+
+
+def collect_spans():
+    return list(_state().spans)
+
+
+def reset_spans():
+    state = _state()
+    state.spans = []
+    state.stack = []
+
+
+# Spans aggregated by their full path ("main;get_visible_objects;star_loop"), in call order
+def summarize_spans(spans=None):
+    spans = collect_spans() if spans is None else spans
+    totals = {}
+    for s in sorted(spans, key=lambda s: s['start_ns']):
+        entry = totals.setdefault(s['path'], {'path': s['path'], 'name': s['name'], 'calls': 0,
+                                              'total_ms': 0.0, 'mem_delta_kb': 0.0})
+        entry['calls'] += 1
+        entry['total_ms'] += s['duration_ns'] / 1e6
+        entry['mem_delta_kb'] += s['mem_delta'] / 1024
+    return list(totals.values())
+
+
+# Indented text "flame graph": one line per span path, bar length relative to the root
+def format_flame_summary(spans=None, width=30):
+    rows = summarize_spans(spans)
+    if not rows:
+        return "(no spans recorded)"
+    root_ms = max(r['total_ms'] for r in rows if ';' not in r['path']) or 1.0
+    track_memory = _memory_tracked()
+    lines = []
+    for r in rows:
+        depth = r['path'].count(';')
+        bar = '█' * max(1, round(width * r['total_ms'] / root_ms))
+        mem = f"  {r['mem_delta_kb']:+.0f} KiB" if track_memory else ''
+        calls = f" x{r['calls']}" if r['calls'] > 1 else ''
+        lines.append(f"{'  ' * depth}{r['name']:<{28 - 2 * depth}} {r['total_ms']:>9.1f} ms{calls} {bar}{mem}")
+    return '\n'.join(lines)
+
+
+# Chrome trace-event JSON, opens in chrome://tracing or https://ui.perfetto.dev
+def trace_events(spans=None):
+    spans = collect_spans() if spans is None else spans
+    pid = os.getpid()
+    return {'traceEvents': [
+        {'name': s['name'], 'cat': 'merai', 'ph': 'X', 'ts': s['start_ns'] / 1000, 'dur': s['duration_ns'] / 1000,
+         'pid': pid, 'tid': s['thread'], 'args': {'path': s['path'], 'mem_delta_bytes': s['mem_delta']}}
+        for s in spans
+    ]}
+
+
+def dump_trace(path, spans=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(trace_events(spans), f)
+    return path
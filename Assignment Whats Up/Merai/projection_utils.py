@@ -0,0 +1,175 @@
+# Sky chart projections: altitude/azimuth arrays (degrees) to chart coordinates, in NumPy
+#
+#   python projection_utils.py      # time every projection on the full star catalog
+#
+# Shared by every chart: the notebook's polar chart, constellation lines, the dashboard
+# chart, the pydeck views and the tile star field (which uses the inverse).
+#  - 'rectangular': the flat chart, x = azimuth, y = altitude.
+#  - 'polar' (azimuthal equidistant), 'stereographic', 'orthographic': charts around a
+#    centre, zenith by default, drawn as a map of the sky: north up and east right, as on
+#    the notebook's polar chart (x = r sin(az), y = r cos(az)). Coordinates are "chart
+#    degrees", scaled so the horizon of a zenith chart is the circle of radius 90 in all
+#    three, so the polar chart is exactly r = 90 - altitude. Another centre (alt, az) tilts
+#    the sky about the horizontal axis across that azimuth until the centre is at the
+#    zenith, then turns the chart so the zenith is straight above the centre.
+# clip_horizon drops points below the horizon, fov (degrees across) culls points further
+# than fov / 2 from the centre, on every projection including the flat chart (whose
+# coordinates do not depend on the centre). Orthographic never shows the far hemisphere.
+import time
+
+import numpy as np
+
+PROJECTIONS = ('rectangular', 'polar', 'stereographic', 'orthographic')
+AZIMUTHAL_PROJECTIONS = PROJECTIONS[1:]
+ZENITH = (90.0, 0.0)
+
+
+def _check(projection):
+    if projection not in PROJECTIONS:
+        raise ValueError(f"unknown projection {projection!r}, expected one of {', '.join(PROJECTIONS)}")
+
+
+# Chart radius for an angular distance c (radians) from the centre, and back
+def _radius(c, projection):
+    if projection == 'polar':
+        return np.degrees(c)
+    if projection == 'stereographic':
+        return 90.0 * np.tan(c / 2)
+    return 90.0 * np.sin(c)
+
+
+def _distance(r, projection):
+    if projection == 'polar':
+        return np.radians(r)
+    if projection == 'stereographic':
+        return 2 * np.arctan(r / 90.0)
+    return np.arcsin(np.clip(r / 90.0, -1, 1))
+
+
+# Radius of the circle bounding a field of view of fov degrees around the centre
+def chart_radius(projection, fov=180.0):
+    _check(projection)
+    if projection == 'rectangular':
+        return None
+    return float(_radius(np.radians(min(fov, 180.0) / 2), projection))
+
+
+def _is_zenith(center):
+    return center[0] >= 90.0
+
+
+# Rotation taking the centre direction to the zenith, in (north, east, up) coordinates;
+# the zenith itself ends up at azimuth az0 + 180
+def _center_rotation(center):
+    alt0, az0 = np.radians(center)
+    angle = np.pi / 2 - alt0
+    k = np.array([np.sin(az0), -np.cos(az0), 0.0])
+    K = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+    return np.eye(3) + np.sin(angle) * K + (1 - np.cos(angle)) * (K @ K)
+
+
+def _vectors(alt, az):
+    return np.stack([np.cos(alt) * np.cos(az), np.cos(alt) * np.sin(az), np.sin(alt)], axis=-1)
+
+
+# Angular distance c from the centre and position angle theta on the chart (radians)
+def _from_center(alt, az, center):
+    if _is_zenith(center):
+        return np.pi / 2 - alt, az
+    v = _vectors(alt, az) @ _center_rotation(center).T
+    return np.arccos(np.clip(v[..., 2], -1, 1)), np.arctan2(v[..., 1], v[..., 0]) - np.radians(center[1] + 180.0)
+
+
+def _in_fov(c, fov):
+    return c <= np.radians(min(fov, 360.0) / 2) + 1e-12
+
+
+# Chart coordinates (x, y) and a visibility mask for altitude/azimuth arrays of any shape
+def project(altitude, azimuth, projection='stereographic', center=ZENITH, fov=180.0, clip_horizon=True):
+    _check(projection)
+    altitude = np.asarray(altitude, dtype=float)
+    azimuth = np.asarray(azimuth, dtype=float)
+    visible = altitude >= 0 if clip_horizon else np.ones(np.broadcast(altitude, azimuth).shape, dtype=bool)
+    c, theta = _from_center(np.radians(altitude), np.radians(azimuth), center)
+    visible = visible & _in_fov(c, fov)
+    if projection == 'rectangular':
+        x, y = np.broadcast_arrays(azimuth, altitude)
+        return x.astype(float), y.astype(float), visible
+    r = _radius(c, projection)
+    if projection == 'orthographic':
+        visible &= c <= np.pi / 2
+    return r * np.sin(theta), r * np.cos(theta), visible
+
+
+# Altitude/azimuth (degrees) of chart coordinates, and a mask of the points that lie on the
+# chart at all (inside the projection's domain and the field of view)
+def unproject(x, y, projection='stereographic', center=ZENITH, fov=180.0):
+    _check(projection)
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    if projection == 'rectangular':
+        valid = (y >= -90) & (y <= 90) & _in_fov(_from_center(np.radians(y), np.radians(x), center)[0], fov)
+        return y.copy(), x % 360.0, valid
+    r = np.hypot(x, y)
+    c = _distance(r, projection)
+    valid = _in_fov(c, fov)
+    if projection == 'orthographic':
+        valid &= r <= 90.0
+    theta = np.arctan2(x, y)
+    alt, az = np.pi / 2 - c, theta
+    if not _is_zenith(center):
+        v = _vectors(alt, theta + np.radians(center[1] + 180.0)) @ _center_rotation(center)
+        alt = np.arcsin(np.clip(v[..., 2], -1, 1))
+        az = np.arctan2(v[..., 1], v[..., 0])
+    return np.degrees(alt), np.degrees(az) % 360.0, valid
+
+
+# Line segments given by the altitude/azimuth of both ends, arrays (n, 2). Segments with at
+# least one end above the horizon are cut where their great circle meets it, then
+# projected. Returns chart coordinates (m, 2, 2) and the rows kept. Rectangular charts
+# also drop segments that would run across azimuth 0/360.
+def project_segments(altitude, azimuth, projection='stereographic', center=ZENITH, fov=180.0):
+    _check(projection)
+    altitude = np.asarray(altitude, dtype=float).reshape(-1, 2)
+    azimuth = np.asarray(azimuth, dtype=float).reshape(-1, 2)
+    above = altitude > 0
+    rows = np.flatnonzero(above.any(axis=1))
+    altitude, azimuth, above = altitude[rows], azimuth[rows], above[rows]
+    crossing = np.flatnonzero(above[:, 0] != above[:, 1])
+    if len(crossing):
+        v = _vectors(np.radians(altitude[crossing]), np.radians(azimuth[crossing]))
+        a, b = v[:, 0], v[:, 1]
+        # (1 - s) a + s b has zero height for s = za / (za - zb), on the great circle a-b
+        s = (a[:, 2] / (a[:, 2] - b[:, 2]))[:, None]
+        p = (1 - s) * a + s * b
+        below = np.where(above[crossing, 0], 1, 0)
+        altitude[crossing, below] = 0.0
+        azimuth[crossing, below] = np.degrees(np.arctan2(p[:, 1], p[:, 0])) % 360.0
+    x, y, visible = project(altitude, azimuth, projection, center, fov, clip_horizon=False)
+    keep = visible.any(axis=1)
+    if projection == 'rectangular':
+        keep &= np.abs(x[:, 0] - x[:, 1]) < 180
+    return np.stack([x[keep], y[keep]], axis=-1), rows[keep]
+
+
+# (theta, r) for matplotlib polar axes with theta zero at north, running clockwise
+def to_polar(x, y):
+    return np.arctan2(x, y), np.hypot(x, y)
+
+
+def main():
+    from catalog_utils import load_catalog_arrays
+    arrays = load_catalog_arrays()
+    rng = np.random.default_rng(0)
+    n = len(arrays['hip'])
+    altitude, azimuth = rng.uniform(-90, 90, n), rng.uniform(0, 360, n)
+    for projection in PROJECTIONS:
+        for center in (ZENITH, (30.0, 180.0)):
+            started = time.perf_counter()
+            x, y, visible = project(altitude, azimuth, projection, center, fov=120.0)
+            elapsed = time.perf_counter() - started
+            print(f"[INFO] {projection:>13} centre {center}: {n} stars in {elapsed * 1000:.1f}ms, "
+                  f"{int(visible.sum())} on the chart")
+
+
+if __name__ == "__main__":
+    main()
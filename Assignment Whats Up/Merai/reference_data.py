@@ -0,0 +1,139 @@
+# Reference tables shipped as Excel workbooks (hip_name.csv.xlsx, bright_stars_bayer.xlsx)
+#
+#   python reference_data.py                 # convert/check every shipped workbook, with timings
+#   python reference_data.py some_table.xlsx
+#
+# A workbook is read with pd.read_excel (openpyxl) only the first time it is used, then kept
+# as a typed structured array (cache/reference/<name>-<hash>.npy: int32 ids, float64 values,
+# fixed-width unicode text) next to a .json recording the source's size and mtime. Later
+# loads are one stat() plus np.load; in the same process, just the stat(). The snapshot is
+# rebuilt automatically when the workbook changes.
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from paths import CACHE_DIR, MODULE_DIR
+
+REFERENCE_DIR = os.path.join(CACHE_DIR, 'reference')
+HIP_NAMES_FILE = os.path.join(MODULE_DIR, 'hip_name.csv.xlsx')
+BRIGHT_STARS_FILE = os.path.normpath(os.path.join(MODULE_DIR, '..', 'Archive and trials', 'bright_stars_bayer.xlsx'))
+REFERENCE_FILES = [HIP_NAMES_FILE, BRIGHT_STARS_FILE]
+
+# path -> (size, mtime, DataFrame)
+_tables = {}
+
+
+def _paths(path, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+    base = os.path.join(cache_dir, f"{stem}-{key}")
+    return base + '.npy', base + '.json'
+
+
+# Structured array for a DataFrame: integers as int32 where they fit, other numbers as
+# float64, everything else as fixed-width text ('' for missing)
+def _to_records(df):
+    fields, columns = [], []
+    for name in df.columns:
+        values = df[name]
+        if pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+            info = np.iinfo(np.int32)
+            fits = values.empty or (values.min() >= info.min and values.max() <= info.max)
+            dtype = np.int32 if fits else np.int64
+            column = values.to_numpy(dtype=dtype)
+        elif pd.api.types.is_numeric_dtype(values):
+            dtype = np.float64
+            column = values.to_numpy(dtype=dtype)
+        else:
+            column = values.fillna('').astype(str).to_numpy(dtype=str)
+            dtype = f"U{max(1, column.dtype.itemsize // 4)}"
+        fields.append((str(name), dtype))
+        columns.append(column)
+    records = np.empty(len(df), dtype=fields)
+    for (name, _), column in zip(fields, columns):
+        records[name] = column
+    return records
+
+
+def _from_records(records, index):
+    df = pd.DataFrame({name: records[name] for name in records.dtype.names})
+    for name in records.dtype.names:
+        if records.dtype[name].kind == 'U':
+            df[name] = df[name].astype(object).where(df[name] != '', None)
+    if index in df.columns:
+        df = df.set_index(index).sort_index(kind='stable')
+    return df
+
+
+def _convert(path, cache_dir):
+    records = _to_records(pd.read_excel(path))
+    stat = os.stat(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    records_path, meta_path = _paths(path, cache_dir)
+    with open(records_path + '.tmp', 'wb') as f:
+        np.save(f, records)
+    os.replace(records_path + '.tmp', records_path)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'source': path, 'size': stat.st_size, 'mtime': stat.st_mtime, 'rows': len(records)}, f, indent=1)
+    os.replace(meta_path + '.tmp', meta_path)
+    print(f"[INFO] Converted {os.path.basename(path)} ({len(records)} rows) to {records_path}")
+    return records
+
+
+# The workbook at path as a typed DataFrame indexed (and sorted) by the `index` column,
+# converted on first use and re-read only when the workbook's size or mtime changes.
+# Returns None when the workbook does not exist.
+def load_reference_table(path, index='hip', cache_dir=REFERENCE_DIR):
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    cached = _tables.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+        return cached[2]
+    records_path, meta_path = _paths(path, cache_dir)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        fresh = meta['size'] == stat.st_size and meta['mtime'] == stat.st_mtime
+        records = np.load(records_path) if fresh else None
+    except (OSError, ValueError, KeyError):
+        records = None
+    if records is None:
+        records = _convert(path, cache_dir)
+    table = _from_records(records, index)
+    _tables[path] = (stat.st_size, stat.st_mtime, table)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the shipped Excel reference tables to cached binary form")
+    parser.add_argument('paths', nargs='*', default=REFERENCE_FILES)
+    parser.add_argument('--index', default='hip')
+    args = parser.parse_args()
+    for path in args.paths:
+        started = time.perf_counter()
+        table = load_reference_table(path, args.index)
+        if table is None:
+            print(f"[WARN] Reference table not found: {path}")
+            continue
+        first = time.perf_counter() - started
+        _tables.pop(os.path.abspath(path), None)
+        started = time.perf_counter()
+        load_reference_table(path, args.index)
+        cached = time.perf_counter() - started
+        started = time.perf_counter()
+        pd.read_excel(path)
+        excel = time.perf_counter() - started
+        print(f"[INFO] {os.path.basename(path)}: {len(table)} rows, columns "
+              f"{', '.join(f'{name} {dtype}' for name, dtype in table.dtypes.astype(str).items())}; "
+              f"first load {first * 1000:.1f}ms, cached {cached * 1000:.1f}ms, read_excel {excel * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
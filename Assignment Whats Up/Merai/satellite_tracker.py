@@ -0,0 +1,100 @@
+# Live satellite tracking state for the dashboard
+#
+#   python satellite_tracker.py --lat 53.55 --lon 9.99 --seconds 10
+#
+# A tracker (plain dict, kept in the Streamlit session) holds the SGP4 state for one site:
+# the satellites whose orbital plane comes within reach of the site during the next
+# CANDIDATE_MINUTES (prefilter_utils.pass_windows), built once into a SatrecArray. Each
+# frame propagates only those candidates in one call and diffs the result against the last
+# frame. Only satellites that moved more than MOVE_THRESHOLD_DEG, rose or set are reported,
+# and the candidate set is rebuilt when it expires or the site changes.
+import argparse
+import time
+
+import numpy as np
+
+from astro_utils import get_timescale
+from prefilter_utils import pass_windows
+from satellite_utils import DEFAULT_MIN_ALTITUDE, build_propagator_from_satrecs, satellite_altaz
+from tle_store import load_elements, satrecs_from_elements
+
+CANDIDATE_MINUTES = 10
+MOVE_THRESHOLD_DEG = 0.05
+LIVE_REFRESH_SECONDS = 1
+
+
+def new_tracker(lat, lon, elements=None, min_altitude=DEFAULT_MIN_ALTITUDE, elevation_m=0.0):
+    elements = load_elements() if elements is None else elements
+    return {'site': (lat, lon), 'elevation_m': elevation_m, 'min_altitude': min_altitude,
+            'elements': elements, 'satrecs': satrecs_from_elements(elements),
+            'propagator': None, 'candidates_from': np.inf, 'candidates_until': -np.inf,
+            'positions': {}, 'frames': 0, 'pushed': 0}
+
+
+def _refresh_candidates(tracker, t):
+    ts = get_timescale()
+    lat, lon = tracker['site']
+    times = ts.tt_jd(t.tt + np.arange(CANDIDATE_MINUTES + 1) / 1440.0)
+    candidates = np.flatnonzero(pass_windows(tracker['elements'], lat, lon, times,
+                                             tracker['min_altitude']).any(axis=1))
+    tracker['propagator'] = build_propagator_from_satrecs(
+        tracker['elements']['name'][candidates].tolist(), [tracker['satrecs'][i] for i in candidates])
+    tracker['candidates_from'] = t.tt
+    tracker['candidates_until'] = t.tt + CANDIDATE_MINUTES / 1440.0
+
+
+# Advance the tracker to time t (skyfield Time). Returns the rows that changed since the
+# last frame ('changed': name, norad, altitude, azimuth, range_km) and the NORAD ids that
+# went below the mask ('removed').
+def update_tracker(tracker, t):
+    if not tracker['candidates_from'] <= t.tt < tracker['candidates_until']:
+        _refresh_candidates(tracker, t)
+    propagator = tracker['propagator']
+    changed, positions = [], tracker['positions']
+    current = set()
+    if propagator['names']:
+        lat, lon = tracker['site']
+        alt, az, distance = satellite_altaz(propagator, lat, lon, t, tracker['elevation_m'])
+        for i in np.flatnonzero(alt[:, 0] > tracker['min_altitude']):
+            norad = int(propagator['norad'][i])
+            current.add(norad)
+            row = {'name': propagator['names'][i], 'norad': norad, 'altitude': round(float(alt[i, 0]), 2),
+                   'azimuth': round(float(az[i, 0]), 2), 'range_km': round(float(distance[i, 0]), 1)}
+            last = positions.get(norad)
+            if last is None or max(abs(row['altitude'] - last['altitude']),
+                                   abs((row['azimuth'] - last['azimuth'] + 180) % 360 - 180)) > MOVE_THRESHOLD_DEG:
+                positions[norad] = row
+                changed.append(row)
+    removed = [norad for norad in positions if norad not in current]
+    for norad in removed:
+        del positions[norad]
+    tracker['frames'] += 1
+    tracker['pushed'] += len(changed) + len(removed)
+    return {'changed': changed, 'removed': removed}
+
+
+# Current (last pushed) position of every tracked satellite, highest first
+def tracker_rows(tracker):
+    return sorted(tracker['positions'].values(), key=lambda row: -row['altitude'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow the satellites above a site at 1 Hz in the terminal")
+    parser.add_argument('--lat', type=float, default=53.55)
+    parser.add_argument('--lon', type=float, default=9.99)
+    parser.add_argument('--seconds', type=int, default=10)
+    parser.add_argument('--min-altitude', type=float, default=DEFAULT_MIN_ALTITUDE)
+    args = parser.parse_args()
+    tracker = new_tracker(args.lat, args.lon, min_altitude=args.min_altitude)
+    ts = get_timescale()
+    for _ in range(args.seconds):
+        started = time.perf_counter()
+        update = update_tracker(tracker, ts.now())
+        print(f"[INFO] {len(tracker['positions'])} up, {len(update['changed'])} moved, "
+              f"{len(update['removed'])} set, {len(tracker['propagator']['names'])} candidates "
+              f"({(time.perf_counter() - started) * 1000:.1f}ms)")
+        time.sleep(max(0.0, LIVE_REFRESH_SECONDS - (time.perf_counter() - started)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Satellite engine: a whole TLE set in one array-based SGP4 propagator
+#
+#   python satellite_utils.py ../stations.txt --lat 53.55 --lon 9.99 --validate
+#
+# All satellites are propagated together (sgp4's SatrecArray, C++ when available) over a
+# time array. TEME -> Earth-fixed is one rotation by GMST per time step, and altitude,
+# azimuth and the elevation mask are plain NumPy. There is no per-satellite Python loop,
+# so CelesTrak "active"-sized sets (~10k objects) stay interactive.
+import argparse
+import time
+
+import numpy as np
+from sgp4.api import Satrec, SatrecArray, WGS72, jday
+from skyfield.api import wgs84
+from skyfield.sgp4lib import theta_GMST1982
+
+from astro_utils import get_timescale
+
+DEFAULT_MIN_ALTITUDE = 10.0  # degrees, the notebook's visibility mask
+
+
+# (name, line1, line2) tuples from TLE text, with or without a name line before each pair
+def read_tle_text(text):
+    tles = []
+    name = None
+    lines = [line.rstrip() for line in text.splitlines() if line.strip()]
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('1 ') and i + 1 < len(lines) and lines[i + 1].startswith('2 '):
+            satnum = line[2:7].strip()
+            tles.append(((name or satnum).strip(), line, lines[i + 1]))
+            name = None
+            i += 2
+        else:
+            name = line
+            i += 1
+    return tles
+
+
+def read_tle_file(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return read_tle_text(f.read())
+
+
+# Element arrays pulled from a list of Satrec, used for filtering and bookkeeping
+def satrec_elements(satrecs):
+    return {
+        'norad': np.array([s.satnum for s in satrecs], dtype=np.int32),
+        'epoch_jd': np.array([s.jdsatepoch + s.jdsatepochF for s in satrecs]),
+        'inclination': np.array([s.inclo for s in satrecs]),  # radians
+        'eccentricity': np.array([s.ecco for s in satrecs]),
+        'mean_motion': np.array([s.no_kozai for s in satrecs]),  # radians per minute
+    }
+
+
+# Propagator dict: names, element arrays and one SatrecArray for the whole set
+def build_propagator_from_satrecs(names, satrecs):
+    return {'names': list(names), 'satrecs': list(satrecs), 'array': SatrecArray(list(satrecs)),
+            **satrec_elements(satrecs)}
+
+
+def build_propagator(tles):
+    satrecs = [Satrec.twoline2rv(line1, line2, WGS72) for _, line1, line2 in tles]
+    return build_propagator_from_satrecs([name for name, _, _ in tles], satrecs)
+
+
+# TEME -> Earth-fixed (pseudo Earth-fixed, no polar motion): one rotation by GMST per time.
+# r has shape (..., n_times, 3) and t holds n_times times.
+def teme_to_itrs(r, t):
+    theta, _ = theta_GMST1982(np.atleast_1d(t.whole), np.atleast_1d(t.ut1_fraction))
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    x, y = r[..., 0], r[..., 1]
+    return np.stack([cos_t * x + sin_t * y, -sin_t * x + cos_t * y, r[..., 2]], axis=-1)
+
+
+# SGP4 runs on UTC, like skyfield's EarthSatellite: (jd, fraction) arrays for sgp4/sgp4_array,
+# from the public UTC calendar fields of t (sgp4's jday works on whole arrays)
+def sgp4_times(t):
+    utc = t.utc
+    jd, fraction = jday(utc.year, utc.month, utc.day, utc.hour, utc.minute, utc.second)
+    fraction = np.atleast_1d(np.asarray(fraction, dtype=float))
+    return np.broadcast_to(np.asarray(jd, dtype=float), fraction.shape).copy(), fraction
+
+
+# Earth-fixed positions in km, shape (n_sats, n_times, 3), plus the SGP4 error codes
+# (0 = fine), shape (n_sats, n_times)
+def propagate_itrs(propagator, t):
+    errors, r, _ = propagator['array'].sgp4(*sgp4_times(t))
+    return teme_to_itrs(r, t), errors
+
+
+# Altitude, azimuth (degrees) and range (km) of Earth-fixed positions r_fixed (..., 3)
+def topocentric_altaz(r_fixed, lat, lon, elevation_m=0.0):
+    d = r_fixed - wgs84.latlon(lat, lon, elevation_m).itrs_xyz.km
+    phi, lam = np.radians(lat), np.radians(lon)
+    east = -np.sin(lam) * d[..., 0] + np.cos(lam) * d[..., 1]
+    north = (-np.sin(phi) * np.cos(lam) * d[..., 0] - np.sin(phi) * np.sin(lam) * d[..., 1]
+             + np.cos(phi) * d[..., 2])
+    up = np.cos(phi) * np.cos(lam) * d[..., 0] + np.cos(phi) * np.sin(lam) * d[..., 1] + np.sin(phi) * d[..., 2]
+    horizontal = np.hypot(east, north)
+    alt = np.degrees(np.arctan2(up, horizontal))
+    az = np.degrees(np.arctan2(east, north)) % 360.0
+    return alt, az, np.sqrt(horizontal ** 2 + up ** 2)
+
+
+# Altitude, azimuth (degrees) and range (km) of every satellite at every time for one
+# observer, shape (n_sats, n_times); decayed/failed propagations come back as NaN
+def satellite_altaz(propagator, lat, lon, t, elevation_m=0.0):
+    r, errors = propagate_itrs(propagator, t)
+    alt, az, distance = topocentric_altaz(r, lat, lon, elevation_m)
+    failed = errors != 0
+    alt[failed] = az[failed] = distance[failed] = np.nan
+    return alt, az, distance
+
+
+# Satellites above min_altitude at one time, as the notebook's result dicts
+def visible_satellites(propagator, lat, lon, t, min_altitude=DEFAULT_MIN_ALTITUDE, elevation_m=0.0):
+    alt, az, _ = satellite_altaz(propagator, lat, lon, t, elevation_m)
+    alt, az = alt[:, 0], az[:, 0]
+    above = np.flatnonzero(alt > min_altitude)
+    above = above[np.argsort(-alt[above])]
+    return [{'name': propagator['names'][i], 'type': 'Satellite', 'norad': int(propagator['norad'][i]),
+             'altitude': round(float(alt[i]), 2), 'azimuth': round(float(az[i]), 2)} for i in above]
+
+
+# Largest angular difference (arcsec) to skyfield's per-satellite (sat - topos).at(t).altaz()
+def validate_against_skyfield(tles, lat, lon, t):
+    from skyfield.api import EarthSatellite
+    propagator = build_propagator(tles)
+    alt, az, _ = satellite_altaz(propagator, lat, lon, t)
+    topos = wgs84.latlon(lat, lon)
+    ts = get_timescale()
+    worst = 0.0
+    for i, (name, line1, line2) in enumerate(tles):
+        ref_alt, ref_az, _ = (EarthSatellite(line1, line2, name, ts) - topos).at(t).altaz()
+        a1, a2 = np.radians(alt[i]), ref_alt.radians
+        cos_sep = np.sin(a1) * np.sin(a2) + np.cos(a1) * np.cos(a2) * np.cos(np.radians(az[i]) - ref_az.radians)
+        worst = max(worst, float(np.nanmax(np.degrees(np.arccos(np.clip(cos_sep, -1, 1))))) * 3600)
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Visible satellites from a TLE file, all propagated at once")
+    parser.add_argument('tle_file')
+    parser.add_argument('--lat', type=float, default=53.55)
+    parser.add_argument('--lon', type=float, default=9.99)
+    parser.add_argument('--min-altitude', type=float, default=DEFAULT_MIN_ALTITUDE)
+    parser.add_argument('--validate', action='store_true', help='compare with skyfield over a day from the TLE epoch')
+    args = parser.parse_args()
+    tles = read_tle_file(args.tle_file)
+    propagator = build_propagator(tles)
+    t = get_timescale().now()
+    started = time.perf_counter()
+    visible = visible_satellites(propagator, args.lat, args.lon, t, args.min_altitude)
+    print(f"[INFO] {len(tles)} satellites propagated in {(time.perf_counter() - started) * 1000:.1f}ms, "
+          f"{len(visible)} above {args.min_altitude}°")
+    for obj in visible:
+        print(f"  {obj['name']:<28}{obj['altitude']:>8.2f}{obj['azimuth']:>9.2f}")
+    if args.validate:
+        times = get_timescale().tt_jd(np.median(propagator['epoch_jd']) + np.arange(0, 1, 1 / 288))
+        print(f"[INFO] Max difference to skyfield: {validate_against_skyfield(tles, args.lat, args.lon, times):.2f} arcsec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# Pre-rendered all-sky tile pyramid (static star field + constellation lines)
+#
+#   python sky_tiles.py prerender --max-level 3     # fill the pyramid up to a zoom level
+#   python sky_tiles.py info                        # tiles on disk, cache limits
+#   python sky_tiles.py chart --lat 53.55 --lon 9.99 -o horizon.png
+#
+# The part of the sky that does not move relative to the stars is drawn once, in RA/Dec,
+# into an equirectangular pyramid: level z is 2^(z+1) x 2^z tiles of TILE_SIZE pixels
+# (RA 0..360 left to right, Dec +90 at the top) under cache/sky_tiles/v<TILE_VERSION>/
+# z/x_y.png. Tiles are rendered with Pillow on first use and kept in an in-memory LRU,
+# and on disk up to MAX_DISK_TILES, least recently used first out. A chart then only
+# reprojects: every output pixel is unprojected to (azimuth, altitude) for the chart's
+# projection (projection_utils), turned into RA/Dec with the site's rotation matrix at t
+# and looked up in the cached tiles; the caller draws the moving bodies on top.
+import argparse
+from collections import OrderedDict
+import os
+import threading
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from catalog_utils import load_catalog_arrays, magnitude_prefix
+from constellation_utils import load_constellation_segments, resolve_segments
+from paths import CACHE_DIR
+from projection_utils import PROJECTIONS, ZENITH, chart_radius, unproject
+
+# Bump when the tile style changes, old tiles are then simply never read again
+TILE_VERSION = 1
+TILE_DIR = os.path.join(CACHE_DIR, 'sky_tiles', f"v{TILE_VERSION}")
+TILE_SIZE = 256
+MAX_LEVEL = 6
+MEMORY_TILES = 128
+MAX_DISK_TILES = int(os.environ.get('MERAI_SKY_TILE_LIMIT', 4096))
+# Faintest magnitude drawn at each level: deeper levels show fainter stars
+BASE_MAG_LIMIT = 5.0
+MAG_LIMIT_PER_LEVEL = 0.75
+MAX_MAG_LIMIT = 9.0
+STAR_COLOR = (255, 255, 255)
+LINE_COLOR = (120, 140, 200, 150)
+# Constellation lines are drawn as great circles sampled every this many degrees
+LINE_STEP_DEG = 1.0
+HIPPARCOS_EPOCH_YEAR = 1991.25
+
+_field = {}
+_tiles = OrderedDict()
+_disk_tiles = None
+_tile_lock = threading.Lock()
+
+
+def level_mag_limit(level):
+    return min(BASE_MAG_LIMIT + MAG_LIMIT_PER_LEVEL * level, MAX_MAG_LIMIT)
+
+
+# Pyramid size of a level in tiles (columns, rows) and degrees per tile pixel
+def level_shape(level):
+    return 2 ** (level + 1), 2 ** level
+
+
+def level_scale(level):
+    return 180.0 / (2 ** level * TILE_SIZE)
+
+
+# Finest level whose pixels are still at least deg_per_pixel (a chart pixel) wide, so a
+# nearest-pixel lookup never steps over a small star
+def level_for_scale(deg_per_pixel):
+    for level in range(MAX_LEVEL, 0, -1):
+        if level_scale(level) >= deg_per_pixel:
+            return level
+    return 0
+
+
+# Catalog positions moved to J2000 (proper motion only) and the constellation figures as
+# great-circle polylines in RA/Dec, built once per process
+def _star_field():
+    if not _field:
+        arrays = load_catalog_arrays()
+        years = 2000.0 - HIPPARCOS_EPOCH_YEAR
+        dec = np.asarray(arrays['dec_degrees']) + np.asarray(arrays['dec_mas_per_year']) * years / 3.6e6
+        cos_dec = np.maximum(np.cos(np.radians(dec)), 1e-6)
+        ra = np.asarray(arrays['ra_hours']) * 15.0 + np.asarray(arrays['ra_mas_per_year']) * years / 3.6e6 / cos_dec
+        _field.update(arrays=arrays, ra=ra % 360.0, dec=np.clip(dec, -90.0, 90.0),
+                      magnitude=np.asarray(arrays['magnitude']), lines=_constellation_polylines(arrays, ra, dec))
+    return _field
+
+
+def _unit_vectors(ra, dec):
+    ra, dec = np.radians(ra), np.radians(dec)
+    return np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+# One (n, 2) array of (ra, dec) per segment, sampled along the great circle and unwrapped
+# in RA (values may leave 0..360) so the polyline never jumps across the map
+def _constellation_polylines(arrays, ra, dec):
+    segments = load_constellation_segments()
+    idx = resolve_segments(segments, np.asarray(arrays['hip']))
+    idx = idx[(idx >= 0).all(axis=1)]
+    ends = _unit_vectors(ra[idx], dec[idx])
+    lines = []
+    for a, b in ends:
+        angle = np.degrees(np.arccos(np.clip(a @ b, -1, 1)))
+        s = np.linspace(0, 1, max(2, int(np.ceil(angle / LINE_STEP_DEG)) + 1))[:, None]
+        # Normalised linear interpolation follows the great circle for segments < 180°
+        v = (1 - s) * a + s * b
+        v /= np.linalg.norm(v, axis=1)[:, None]
+        line_ra = np.unwrap(np.arctan2(v[:, 1], v[:, 0]))
+        line_ra = np.degrees(line_ra - 2 * np.pi * np.floor(line_ra[0] / (2 * np.pi)))
+        lines.append(np.column_stack([line_ra, np.degrees(np.arcsin(np.clip(v[:, 2], -1, 1)))]))
+    return lines
+
+
+def _render_tile(level, x, y):
+    field = _star_field()
+    columns, _ = level_shape(level)
+    width = columns * TILE_SIZE
+    scale = level_scale(level)
+    x0, y0 = x * TILE_SIZE, y * TILE_SIZE
+    img = Image.new('RGBA', (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img, 'RGBA')
+    for line in field['lines']:
+        px, py = line[:, 0] / scale - x0, (90.0 - line[:, 1]) / scale - y0
+        if py.max() < -2 or py.min() > TILE_SIZE + 2:
+            continue
+        # Draw the copies one map width left/right as well, for lines across RA 0
+        for shift in (-width, 0, width):
+            if px.max() + shift >= -2 and px.min() + shift <= TILE_SIZE + 2:
+                draw.line(list(zip((px + shift).tolist(), py.tolist())), fill=LINE_COLOR, width=1)
+    mag_limit = level_mag_limit(level)
+    n = magnitude_prefix(field['arrays'], mag_limit)
+    ra, dec, mag = field['ra'][:n], field['dec'][:n], field['magnitude'][:n]
+    # Brighter stars are bigger and more opaque. Stars are widened in RA by 1/cos(dec) so
+    # they stay round once reprojected onto the sky.
+    radius = np.clip(0.6 + 0.45 * (mag_limit - mag), 0.8, 4.0)
+    radius_x = np.minimum(radius / np.maximum(np.cos(np.radians(dec)), 0.02), TILE_SIZE / 2)
+    alpha = np.clip(90 + 40 * (mag_limit - mag), 90, 255).astype(int)
+    px = (ra / scale - x0 + TILE_SIZE / 2) % width - TILE_SIZE / 2
+    py = (90.0 - dec) / scale - y0
+    inside = np.flatnonzero((px + radius_x >= 0) & (px - radius_x <= TILE_SIZE)
+                            & (py + radius >= 0) & (py - radius <= TILE_SIZE))
+    for i in inside[::-1]:  # faintest first, bright stars end up on top
+        draw.ellipse([px[i] - radius_x[i], py[i] - radius[i], px[i] + radius_x[i], py[i] + radius[i]],
+                     fill=STAR_COLOR + (int(alpha[i]),))
+    return np.asarray(img)
+
+
+def _tile_path(level, x, y, tile_dir):
+    return os.path.join(tile_dir, str(level), f"{x}_{y}.png")
+
+
+# Tiles on disk in least recently used order (file mtime, refreshed on every use)
+def _disk_index(tile_dir):
+    global _disk_tiles
+    if _disk_tiles is None or _disk_tiles[0] != tile_dir:
+        found = []
+        for root, _, files in os.walk(tile_dir):
+            for name in files:
+                if name.endswith('.png'):
+                    path = os.path.join(root, name)
+                    found.append((os.path.getmtime(path), path))
+        _disk_tiles = (tile_dir, OrderedDict((path, None) for _, path in sorted(found)))
+    return _disk_tiles[1]
+
+
+def _store_tile(path, tile, tile_dir):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Per-process temp name: API/batch workers may render the same tile at once
+    tmp = f"{path}.{os.getpid()}.tmp"
+    Image.fromarray(tile, 'RGBA').save(tmp, format='PNG', compress_level=1)
+    os.replace(tmp, path)
+    index = _disk_index(tile_dir)
+    index[path] = None
+    while len(index) > MAX_DISK_TILES:
+        old, _ = index.popitem(last=False)
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+# One tile as an RGBA array (TILE_SIZE, TILE_SIZE, 4): from memory, else from disk, else
+# rendered now and written to disk
+def get_tile(level, x, y, tile_dir=TILE_DIR):
+    key = (tile_dir, level, x, y)
+    with _tile_lock:
+        tile = _tiles.get(key)
+        if tile is not None:
+            _tiles.move_to_end(key)
+            return tile
+        path = _tile_path(level, x, y, tile_dir)
+        index = _disk_index(tile_dir)
+        if path in index and os.path.exists(path):
+            tile = np.asarray(Image.open(path).convert('RGBA'))
+            index.move_to_end(path)
+            os.utime(path)
+        else:
+            tile = _render_tile(level, x, y)
+            _store_tile(path, tile, tile_dir)
+        _tiles[key] = tile
+        while len(_tiles) > MEMORY_TILES:
+            _tiles.popitem(last=False)
+        return tile
+
+
+# Colours at the given RA/Dec (degrees, any shape) from the level's tiles, nearest pixel
+def sample_sky(ra, dec, level, tile_dir=TILE_DIR):
+    columns, rows = level_shape(level)
+    scale = level_scale(level)
+    px = np.floor((np.asarray(ra) % 360.0) / scale).astype(np.int64) % (columns * TILE_SIZE)
+    py = np.clip(np.floor((90.0 - np.asarray(dec)) / scale).astype(np.int64), 0, rows * TILE_SIZE - 1)
+    tile_ids = (py // TILE_SIZE) * columns + px // TILE_SIZE
+    # The needed tiles stacked once, then every pixel is a single gather
+    needed = np.flatnonzero(np.bincount(tile_ids.ravel(), minlength=columns * rows))
+    slot = np.zeros(columns * rows, dtype=np.int64)
+    slot[needed] = np.arange(len(needed))
+    tiles = np.stack([get_tile(level, int(i % columns), int(i // columns), tile_dir) for i in needed])
+    return tiles[slot[tile_ids], py % TILE_SIZE, px % TILE_SIZE]
+
+
+# The star field as seen from (lat, lon) at t (skyfield Time) on a chart of the given
+# projection (projection_utils): RGBA array (height, width, 4) covering extent = (x0, x1,
+# y0, y1) in chart coordinates, row 0 at y1; transparent off the chart and below the
+# horizon. The default is the flat chart, azimuth 0..360 by altitude 0..90. Positions are
+# geometric (no refraction or aberration), well below a chart pixel.
+def horizon_star_field(lat, lon, t, width, height, projection='rectangular', extent=None,
+                       center=ZENITH, fov=180.0, level=None, tile_dir=TILE_DIR):
+    from skyfield.api import wgs84
+    if extent is None:
+        radius = chart_radius(projection, fov)
+        extent = (0.0, 360.0, 0.0, 90.0) if radius is None else (-radius, radius, -radius, radius)
+    x0, x1, y0, y1 = extent
+    x = x0 + (np.arange(width) + 0.5) * (x1 - x0) / width
+    y = y1 - (np.arange(height) + 0.5) * (y1 - y0) / height
+    if level is None:
+        # Chart degrees are sky degrees give or take a factor ~1.3 in every projection
+        level = level_for_scale(min((x1 - x0) / width, (y1 - y0) / height))
+    altitude, azimuth, on_chart = unproject(x[None, :], y[:, None], projection, center, fov)
+    alt, az = np.radians(altitude), np.radians(azimuth)
+    # (north, east, up) unit vectors, rotated back into ICRS
+    local = np.stack([np.cos(alt) * np.cos(az), np.cos(alt) * np.sin(az), np.sin(alt)], axis=-1)
+    icrs = local @ wgs84.latlon(lat, lon).rotation_at(t)
+    ra = np.degrees(np.arctan2(icrs[..., 1], icrs[..., 0]))
+    dec = np.degrees(np.arcsin(np.clip(icrs[..., 2], -1, 1)))
+    field = sample_sky(ra, dec, level, tile_dir)
+    field[~(on_chart & (altitude >= 0))] = 0
+    return field
+
+
+# Render (and store) every tile of levels 0..max_level that is not on disk yet
+def prerender(max_level, tile_dir=TILE_DIR):
+    rendered = 0
+    for level in range(max_level + 1):
+        columns, rows = level_shape(level)
+        for y in range(rows):
+            for x in range(columns):
+                if not os.path.exists(_tile_path(level, x, y, tile_dir)):
+                    get_tile(level, x, y, tile_dir)
+                    rendered += 1
+    return rendered
+
+
+def clear_tile_cache():
+    global _disk_tiles
+    with _tile_lock:
+        _tiles.clear()
+        _disk_tiles = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render and inspect the all-sky tile pyramid")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('prerender', help='render all missing tiles up to a level')
+    p.add_argument('--max-level', type=int, default=3)
+    sub.add_parser('info', help='tiles on disk per level')
+    p = sub.add_parser('chart', help='write the horizon star field for a site as PNG')
+    p.add_argument('--lat', type=float, default=53.55)
+    p.add_argument('--lon', type=float, default=9.99)
+    p.add_argument('--width', type=int, default=1200)
+    p.add_argument('--height', type=int, default=300)
+    p.add_argument('--projection', choices=PROJECTIONS, default='rectangular')
+    p.add_argument('-o', '--output', default='horizon_star_field.png')
+    args = parser.parse_args()
+    if args.command == 'prerender':
+        started = time.perf_counter()
+        rendered = prerender(args.max_level)
+        print(f"[INFO] Rendered {rendered} tiles up to level {args.max_level} "
+              f"in {time.perf_counter() - started:.1f}s ({TILE_DIR})")
+    elif args.command == 'info':
+        index = _disk_index(TILE_DIR)
+        counts = {}
+        for path in index:
+            level = os.path.basename(os.path.dirname(path))
+            counts[level] = counts.get(level, 0) + 1
+        for level in range(MAX_LEVEL + 1):
+            columns, rows = level_shape(level)
+            print(f"[INFO] level {level}: {counts.get(str(level), 0)}/{columns * rows} tiles, "
+                  f"{level_scale(level) * 60:.1f}'/px, stars to mag {level_mag_limit(level):g}")
+        print(f"[INFO] {len(index)} of at most {MAX_DISK_TILES} tiles on disk in {TILE_DIR}")
+    else:
+        from astro_utils import get_timescale
+        started = time.perf_counter()
+        field = horizon_star_field(args.lat, args.lon, get_timescale().now(), args.width, args.height,
+                                   args.projection)
+        Image.fromarray(field, 'RGBA').save(args.output)
+        print(f"[INFO] Wrote {args.output} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Interactive WebGL sky view built with pydeck
+# Everything is drawn in the chart plane of a projection_utils projection (by default the
+# flat azimuth (x) / altitude (y) plane) with deck.gl's OrthographicView, so panning and
+# zooming happen in the browser without a Streamlit rerun.
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+from constellation_utils import load_constellation_segments, resolve_segments
+from projection_utils import project, project_segments
+
+STAR_COLOR = [255, 255, 255]
+PLANET_COLORS = {'Sun': [255, 215, 0], 'Moon': [200, 200, 200]}
+DEFAULT_PLANET_COLOR = [255, 80, 60]
+LINE_COLOR = [120, 140, 200, 120]
+SATELLITE_COLOR = [80, 255, 140]
+
+
+# Pixel radius from visual magnitude, a mag 6.5 star is still half a pixel wide
+def star_radius_pixels(magnitudes):
+    mags = np.nan_to_num(np.asarray(magnitudes, dtype=np.float32), nan=6.5)
+    return np.clip(4.0 * np.power(10.0, -0.2 * (mags - 1.0)), 0.5, 10.0).astype(np.float32)
+
+
+def _star_layer(stars, binary_transport, projection):
+    x, y, _ = project(stars['altitude'].to_numpy(), stars['azimuth'].to_numpy(), projection)
+    x, y = x.astype(np.float32), y.astype(np.float32)
+    radius = star_radius_pixels(stars['magnitude'])
+    common = dict(id='stars', get_fill_color=STAR_COLOR, radius_units='pixels', pickable=False)
+    if binary_transport:
+        # Only honoured by the Jupyter widget: columns travel as typed arrays
+        data = pd.DataFrame({'position': list(np.column_stack([x, y])), 'radius': radius})
+        return pdk.Layer('ScatterplotLayer', data, use_binary_transport=True,
+                         get_position='position', get_radius='radius', **common)
+    # Streamlit serialises layers to JSON, keep the payload to three short rounded columns
+    # (float32 values are widened first, otherwise they print with eight spurious digits)
+    data = pd.DataFrame({'x': np.round(x.astype(float), 2), 'y': np.round(y.astype(float), 2),
+                         'r': np.round(radius.astype(float), 1)})
+    return pdk.Layer('ScatterplotLayer', data, get_position='[x, y]', get_radius='r', **common)
+
+
+# Segments cut at the horizon; on the flat chart the ones that would wrap across
+# azimuth 0/360 are dropped
+def _constellation_segments(stars, segments, projection):
+    idx = resolve_segments(segments, stars['hip'].to_numpy())
+    idx = idx[(idx >= 0).all(axis=1)]
+    xy, _ = project_segments(stars['altitude'].to_numpy(dtype=float)[idx],
+                             stars['azimuth'].to_numpy(dtype=float)[idx], projection)
+    return pd.DataFrame({'sx': xy[:, 0, 0], 'sy': xy[:, 0, 1], 'tx': xy[:, 1, 0], 'ty': xy[:, 1, 1]}).round(2)
+
+
+# stars: DataFrame with hip, magnitude, altitude, azimuth (see astro_utils.get_star_altaz)
+# planets: the non-star dicts returned by get_visible_objects
+def build_sky_deck(stars, planets=(), constellation_segments=None, binary_transport=False, projection='rectangular'):
+    if constellation_segments is None:
+        constellation_segments = load_constellation_segments()
+    visible_stars = stars[stars['altitude'] > 0]
+    layers = [
+        pdk.Layer('LineLayer', _constellation_segments(stars, constellation_segments, projection),
+                  id='constellations', get_source_position='[sx, sy]', get_target_position='[tx, ty]',
+                  get_color=LINE_COLOR, get_width=1),
+        _star_layer(visible_stars, binary_transport, projection),
+    ]
+    if planets:
+        x, y, _ = project([p['altitude'] for p in planets], [p['azimuth'] for p in planets], projection,
+                          clip_horizon=False)
+        planet_df = pd.DataFrame({
+            'name': [p['name'] for p in planets],
+            'x': x,
+            'y': y,
+            'color': [PLANET_COLORS.get(p['name'], DEFAULT_PLANET_COLOR) for p in planets],
+        })
+        layers.append(pdk.Layer('ScatterplotLayer', planet_df, id='planets', get_position='[x, y]',
+                                get_fill_color='color', get_radius=7, radius_units='pixels', pickable=True))
+        layers.append(pdk.Layer('TextLayer', planet_df, id='planet-labels', get_position='[x, y]',
+                                get_text='name', get_color='color', get_size=14, get_pixel_offset=[0, -14]))
+    return _sky_deck(layers, projection)
+
+
+def _sky_deck(layers, projection='rectangular'):
+    view = pdk.View(type='OrthographicView', controller=True, flipY=False)
+    target = [180, 45, 0] if projection == 'rectangular' else [0, 0, 0]
+    view_state = pdk.ViewState(target=target, zoom=1, min_zoom=0, max_zoom=8)
+    return pdk.Deck(layers=layers, views=[view], initial_view_state=view_state,
+                    map_style=None, tooltip={'text': '{name}'}, parameters={'clearColor': [0, 0, 0.2, 1]})
+
+
+# Live satellite layer: rows from satellite_tracker.tracker_rows, plus a faint horizon line.
+# Build it once per tracker and projection, then hand each update_tracker result to
+# update_satellite_deck: only the changed rows are projected and swapped into the layer data
+# and the removed ones dropped, everything else keeps its last pushed position (at most
+# satellite_tracker.MOVE_THRESHOLD_DEG behind). st.pydeck_chart still serialises the whole
+# deck on every call, Streamlit has no way to send a layer patch.
+def build_satellite_deck(rows=(), projection='rectangular'):
+    ring = np.linspace(0, 360, 73)
+    hx, hy, _ = project(np.zeros_like(ring), ring, projection)
+    horizon = pd.DataFrame({'sx': hx[:-1], 'sy': hy[:-1], 'tx': hx[1:], 'ty': hy[1:]})
+    deck = _sky_deck([
+        pdk.Layer('LineLayer', horizon, id='horizon', get_source_position='[sx, sy]',
+                  get_target_position='[tx, ty]', get_color=LINE_COLOR, get_width=1),
+        pdk.Layer('ScatterplotLayer', [], id='satellites', get_position='[x, y]', get_fill_color=SATELLITE_COLOR,
+                  get_radius=5, radius_units='pixels', pickable=True),
+        pdk.Layer('TextLayer', [], id='satellite-labels', get_position='[x, y]', get_text='name',
+                  get_color=SATELLITE_COLOR, get_size=12, get_pixel_offset=[0, -12]),
+    ], projection)
+    return update_satellite_deck(deck, {'changed': list(rows), 'removed': []}, projection)
+
+
+# update: {'changed': rows, 'removed': NORAD ids} as returned by satellite_tracker.update_tracker
+def update_satellite_deck(deck, update, projection='rectangular'):
+    layers = [layer for layer in deck.layers if layer.id in ('satellites', 'satellite-labels')]
+    points = {point['norad']: point for point in layers[0].data}
+    for norad in update['removed']:
+        points.pop(norad, None)
+    changed = update['changed']
+    if changed:
+        x, y, _ = project([row['altitude'] for row in changed], [row['azimuth'] for row in changed], projection,
+                          clip_horizon=False)
+        for row, px, py in zip(changed, x.tolist(), y.tolist()):
+            points[row['norad']] = {'norad': row['norad'], 'name': row['name'], 'x': round(px, 2), 'y': round(py, 2)}
+    data = list(points.values())
+    for layer in layers:
+        layer.data = data
+    return deck
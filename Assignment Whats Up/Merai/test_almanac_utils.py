@@ -0,0 +1,72 @@
+# Almanac times checked against skyfield.almanac's own root finding
+#
+#   python -m pytest test_almanac_utils.py    # from the directory holding de421.bsp and hip_main.dat
+from datetime import date
+import os
+
+import numpy as np
+import pytest
+
+if not (os.path.exists('de421.bsp') and os.path.exists('hip_main.dat')):
+    pytest.skip("needs de421.bsp and hip_main.dat in the working directory", allow_module_level=True)
+
+from skyfield import almanac  # noqa: E402
+from skyfield.api import Star, wgs84  # noqa: E402
+
+from almanac_utils import BODY_HORIZONS, STAR_HORIZON, body_almanac, star_almanac  # noqa: E402
+from astro_utils import SOLAR_SYSTEM_BODIES, get_timescale, load_ephemeris, star_set  # noqa: E402
+
+LAT, LON = 53.5511, 9.9937  # Hamburg
+DAY = date(2025, 6, 5)
+
+
+@pytest.fixture(scope='module')
+def site():
+    ts = get_timescale()
+    observer = load_ephemeris()['earth'] + wgs84.latlon(LAT, LON)
+    return observer, ts.utc(DAY.year, DAY.month, DAY.day), ts.utc(DAY.year, DAY.month, DAY.day + 1)
+
+
+def _seconds_off(ours, theirs):
+    return abs((ours.to_pydatetime() - theirs.utc_datetime()).total_seconds())
+
+
+# First rise, set and upper transit of the UTC day, or None for each event that is missing
+def _skyfield_events(site, target, horizon):
+    observer, t0, t1 = site
+    rises, rose = almanac.find_risings(observer, target, t0, t1, horizon_degrees=horizon)
+    sets, set_ = almanac.find_settings(observer, target, t0, t1, horizon_degrees=horizon)
+    transits = almanac.find_transits(observer, target, t0, t1)
+    return (rises[0] if rose.any() else None, sets[0] if set_.any() else None,
+            transits[0] if len(transits) else None)
+
+
+# Table times are rounded to the second
+def test_bodies_match_skyfield(site):
+    table = body_almanac(LAT, LON, DAY)
+    eph = load_ephemeris()
+    for row in table.itertuples():
+        rise, set_, transit = _skyfield_events(site, eph[SOLAR_SYSTEM_BODIES[row.name][0]],
+                                               BODY_HORIZONS.get(row.name, STAR_HORIZON))
+        assert row.status == 'rises and sets'  # for this site and date
+        assert _seconds_off(row.rise, rise) < 2, row.name
+        assert _seconds_off(row.set, set_) < 2, row.name
+        assert _seconds_off(row.transit, transit) < 2, row.name
+
+
+def test_stars_match_skyfield(site):
+    stars, star = star_set(2.0)
+    table = star_almanac(LAT, LON, DAY, 2.0)
+    assert len(table) == len(stars)
+    for i, row in enumerate(table.itertuples()):
+        single = Star(ra_hours=star.ra.hours[i], dec_degrees=star.dec.degrees[i],
+                      ra_mas_per_year=star.ra_mas_per_year[i], dec_mas_per_year=star.dec_mas_per_year[i],
+                      epoch=np.broadcast_to(star.epoch, len(stars))[i])
+        rise, set_, transit = _skyfield_events(site, single, STAR_HORIZON)
+        if row.status == 'rises and sets':
+            assert _seconds_off(row.rise, rise) < 1, row.name
+            assert _seconds_off(row.set, set_) < 1, row.name
+        else:
+            assert rise is None and set_ is None, row.name
+        if row.status != 'never rises':
+            assert _seconds_off(row.transit, transit) < 1, row.name
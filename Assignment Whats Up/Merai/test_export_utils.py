@@ -0,0 +1,65 @@
+# Export round trips for the chunked CSV, Parquet and Arrow writers
+#
+#   python -m pytest test_export_utils.py
+import io
+
+import pytest
+
+from export_utils import open_chunk_writer, stream_export
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+
+def _read(buf, fmt):
+    buf.seek(0)
+    if fmt == 'parquet':
+        return pyarrow.parquet.read_table(buf)
+    return pyarrow.ipc.open_stream(buf).read_all()
+
+
+# First chunk has 'b' all None and 'a' as int, later chunks bring strings and floats
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_types_promoted_across_chunks(fmt):
+    rows = [{'a': 1, 'b': None}] * 3 + [{'a': 2.5, 'b': 'x'}]
+    buf = io.BytesIO()
+    assert stream_export(rows, buf, fmt, chunk_size=2) == 4
+    table = _read(buf, fmt)
+    assert table.schema.field('a').type == pa.float64()
+    assert table.schema.field('b').type == pa.string()
+    assert table.to_pylist() == [{'a': 1.0, 'b': None}] * 3 + [{'a': 2.5, 'b': 'x'}]
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_empty_export_is_valid(fmt):
+    buf = io.BytesIO()
+    assert stream_export([], buf, fmt) == 0
+    assert _read(buf, fmt).num_rows == 0
+
+
+# The header comes from the whole first chunk; a column first seen later cannot be dropped
+def test_csv_rejects_column_after_header():
+    buf = io.BytesIO()
+    with pytest.raises(ValueError):
+        stream_export([{'a': 1}, {'b': 2}, {'a': 3, 'c': 4}], buf, 'csv', chunk_size=2)
+    assert buf.getvalue().decode().splitlines() == ['a,b', '1,', ',2']
+
+
+def test_csv_known_columns_up_front():
+    buf = io.BytesIO()
+    assert stream_export([{'a': 1}, {'b': 2}, {'a': 3, 'c': 4}], buf, 'csv', chunk_size=2,
+                         columns=['a', 'b', 'c']) == 3
+    assert buf.getvalue().decode().splitlines() == ['a,b,c', '1,,', ',2,', '3,,4']
+
+
+# Chunks are spooled, the output only exists once the writer is closed
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_arrow_output_written_on_close(fmt):
+    buf = io.BytesIO()
+    writer = open_chunk_writer(buf, fmt)
+    writer.write([{'a': 1}])
+    writer.write([{'a': 2}])
+    assert buf.getvalue() == b''
+    writer.close()
+    assert _read(buf, fmt).to_pylist() == [{'a': 1}, {'a': 2}]
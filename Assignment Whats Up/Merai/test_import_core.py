@@ -0,0 +1,25 @@
+# Import-time budget of the compute core (benchmark.BUDGETS['import_core'])
+#
+#   python -m pytest test_import_core.py
+import os
+import subprocess
+import sys
+import time
+
+from benchmark import BUDGETS, UI_MODULES
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+CODE = ("import sys; from Merai import get_visible_objects; "
+        f"print(','.join(m for m in {UI_MODULES!r} if m in sys.modules))")
+
+
+# Fresh interpreter per run, the best of three is compared so one cold disk cache cannot fail it
+def test_core_import_within_budget_and_without_ui():
+    times = []
+    for _ in range(3):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', CODE], capture_output=True, text=True, check=True,
+                             cwd=MODULE_DIR).stdout.strip()
+        times.append(time.perf_counter() - started)
+        assert out == '', f"importing the compute core loaded UI modules: {out}"
+    assert min(times) < BUDGETS['import_core']
@@ -0,0 +1,54 @@
+# Predicted passes checked against skyfield's EarthSatellite.find_events
+#
+#   python -m pytest test_pass_utils.py    # from the directory holding de421.bsp
+from datetime import timedelta
+import os
+
+import numpy as np
+import pytest
+
+if not os.path.exists('de421.bsp'):
+    pytest.skip("needs de421.bsp in the working directory", allow_module_level=True)
+
+from skyfield.api import EarthSatellite, wgs84  # noqa: E402
+
+from astro_utils import get_timescale, load_ephemeris  # noqa: E402
+from paths import MODULE_DIR  # noqa: E402
+from pass_utils import predict_passes  # noqa: E402
+from satellite_utils import DEFAULT_MIN_ALTITUDE, build_propagator, read_tle_file  # noqa: E402
+from tle_store import elements_from_satrecs  # noqa: E402
+
+STATIONS_FILE = os.path.join(MODULE_DIR, '..', 'stations.txt')
+LAT, LON = 53.5511, 9.9937  # Hamburg
+
+
+# 24 hours from the TLE epochs for every satellite of stations.txt: the same passes, with
+# rise, culmination and set within two seconds (table times are rounded to the second),
+# the same peak altitude and the same sunlit flag at culmination
+def test_passes_match_find_events():
+    if not os.path.exists(STATIONS_FILE):
+        pytest.skip("needs stations.txt next to the Merai folder")
+    tles = read_tle_file(STATIONS_FILE)
+    propagator = build_propagator(tles)
+    elements = elements_from_satrecs(propagator['names'], propagator['satrecs'])
+    ts = get_timescale()
+    start = ts.tt_jd(np.median(propagator['epoch_jd'])).utc_datetime()
+    t0, t1 = ts.from_datetime(start), ts.from_datetime(start + timedelta(hours=24))
+    table = predict_passes(LAT, LON, start, 24, elements, backend='serial')
+    assert len(table)
+    topos = wgs84.latlon(LAT, LON)
+    for name, line1, line2 in tles:
+        sat = EarthSatellite(line1, line2, name, ts)
+        t, events = sat.find_events(topos, t0, t1, altitude_degrees=DEFAULT_MIN_ALTITUDE)
+        ours = table[table['norad'] == sat.model.satnum]
+        for kind, column in enumerate(('rise', 'culmination', 'set')):
+            expected = t[events == kind]
+            predicted = ours[column].dropna()
+            assert len(predicted) == len(expected), (name, column)
+            for ours_t, ref_t in zip(predicted, expected):
+                assert abs((ours_t.to_pydatetime() - ref_t.utc_datetime()).total_seconds()) < 2, (name, column)
+        culminations = t[events == 1]
+        if len(culminations):
+            ref_alt = (sat - topos).at(culminations).altaz()[0].degrees
+            assert np.abs(ours['max_altitude'].to_numpy() - ref_alt).max() < 0.1, name
+            assert ours['sunlit'].tolist() == sat.at(culminations).is_sunlit(load_ephemeris()).tolist(), name
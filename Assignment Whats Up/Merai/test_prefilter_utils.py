@@ -0,0 +1,47 @@
+# The geometric prefilter must never drop a satellite or a time step that a full SGP4
+# propagation puts above the mask
+#
+#   python -m pytest test_prefilter_utils.py
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sgp4.api import Satrec, WGS72
+
+from astro_utils import get_timescale
+from prefilter_utils import can_ever_be_visible, pass_windows
+from satellite_utils import DEFAULT_MIN_ALTITUDE, build_propagator_from_satrecs, satellite_altaz
+from tle_store import SGP4_EPOCH_ZERO, elements_from_satrecs
+
+START = datetime(2025, 6, 5, tzinfo=timezone.utc)
+SITES = [(53.55, 9.99), (0.0, -60.0), (-33.9, 151.2), (78.2, 15.6)]
+
+
+# Random orbits from LEO to eccentric and retrograde ones, epochs up to ten days old
+@pytest.fixture(scope='module')
+def orbits():
+    rng = np.random.default_rng(1)
+    start_jd = get_timescale().from_datetime(START).tt
+    satrecs = []
+    for i in range(400):
+        sat = Satrec()
+        sat.sgp4init(WGS72, 'i', i + 1, start_jd - rng.uniform(0, 10) - SGP4_EPOCH_ZERO, 1e-4, 0.0, 0.0,
+                     rng.choice([rng.uniform(0, 0.02), rng.uniform(0.02, 0.3)]), rng.uniform(0, 2 * np.pi),
+                     np.radians(rng.uniform(0, 180)), rng.uniform(0, 2 * np.pi),
+                     rng.uniform(2.0, 16.0) * 2 * np.pi / 1440, rng.uniform(0, 2 * np.pi))
+        satrecs.append(sat)
+    names = [f"SAT {i + 1}" for i in range(len(satrecs))]
+    return build_propagator_from_satrecs(names, satrecs), elements_from_satrecs(names, satrecs)
+
+
+@pytest.mark.parametrize('lat, lon', SITES)
+def test_prefilter_keeps_everything_above_the_mask(orbits, lat, lon):
+    propagator, elements = orbits
+    t = get_timescale().from_datetimes([START + timedelta(minutes=m) for m in range(0, 24 * 60, 2)])
+    alt, _, _ = satellite_altaz(propagator, lat, lon, t)
+    above = alt > DEFAULT_MIN_ALTITUDE
+    assert above.any()
+    assert can_ever_be_visible(elements, lat)[above.any(axis=1)].all()
+    windows = pass_windows(elements, lat, lon, t, pad=0)
+    assert not (above & ~windows).any()
+    assert not windows.all()  # and it does skip something
@@ -0,0 +1,55 @@
+# Projection round trips and horizon clipping of constellation segments
+#
+#   python -m pytest test_projection_utils.py
+import numpy as np
+import pytest
+
+from projection_utils import PROJECTIONS, ZENITH, project, project_segments, unproject
+
+CENTERS = [ZENITH, (30.0, 200.0)]
+
+
+# Chord between unit vectors, in degrees: unlike arccos it stays exact for tiny angles
+# and ignores the azimuth at the zenith
+def _separation_deg(alt1, az1, alt2, az2):
+    def unit(alt, az):
+        alt, az = np.radians(alt), np.radians(az)
+        return np.stack([np.cos(alt) * np.cos(az), np.cos(alt) * np.sin(az), np.sin(alt)])
+    alt1, az1, alt2, az2 = np.broadcast_arrays(alt1, az1, alt2, az2)
+    return np.degrees(np.linalg.norm(unit(alt1, az1) - unit(alt2, az2), axis=0))
+
+
+# Every point that lands on the chart comes back where it started
+@pytest.mark.parametrize('projection', PROJECTIONS)
+@pytest.mark.parametrize('center', CENTERS)
+def test_unproject_inverts_project(projection, center):
+    rng = np.random.default_rng(0)
+    altitude = np.degrees(np.arcsin(rng.uniform(-1, 1, 5000)))
+    azimuth = rng.uniform(0, 360, 5000)
+    x, y, visible = project(altitude, azimuth, projection, center, fov=160.0, clip_horizon=False)
+    assert visible.any() and not visible.all()
+    alt_back, az_back, valid = unproject(x[visible], y[visible], projection, center, fov=160.0)
+    assert valid.all()
+    assert _separation_deg(altitude[visible], azimuth[visible], alt_back, az_back).max() < 1e-9
+    # Points culled by the field of view are outside it on the way back too (the far
+    # hemisphere of the orthographic globe folds onto the disc and cannot be told apart)
+    culled = ~visible
+    if projection == 'orthographic':
+        culled &= _separation_deg(altitude, azimuth, *center) < np.degrees(np.sqrt(2))  # chord of 90 deg
+    _, _, valid = unproject(x[culled], y[culled], projection, center, fov=160.0)
+    assert culled.any() and not valid.any()
+
+
+# Segments crossing the horizon end exactly on it, the other end stays put; segments
+# entirely below are dropped
+@pytest.mark.parametrize('projection', PROJECTIONS)
+def test_segments_clipped_at_horizon(projection):
+    altitude = np.array([[20.0, -15.0], [-30.0, 45.0], [10.0, 60.0], [-5.0, -40.0]])
+    azimuth = np.array([[100.0, 120.0], [250.0, 230.0], [10.0, 40.0], [300.0, 310.0]])
+    xy, rows = project_segments(altitude, azimuth, projection)
+    assert rows.tolist() == [0, 1, 2]
+    alt, az, _ = unproject(xy[..., 0], xy[..., 1], projection)
+    assert np.allclose(alt, [[20.0, 0.0], [0.0, 45.0], [10.0, 60.0]], atol=1e-9)
+    assert np.allclose(az[[0, 1, 2], [0, 1, 0]], [100.0, 230.0, 10.0], atol=1e-9)
+    # The clipped ends lie between the original azimuths, on the segment's great circle
+    assert 100.0 < az[0, 1] < 120.0 and 230.0 < az[1, 0] < 250.0
@@ -0,0 +1,42 @@
+# SatrecArray engine checked against skyfield's per-satellite EarthSatellite
+#
+#   python -m pytest test_satellite_utils.py
+import os
+
+import numpy as np
+import pytest
+from skyfield.api import EarthSatellite, wgs84
+
+from astro_utils import get_timescale
+from paths import MODULE_DIR
+from satellite_utils import build_propagator, read_tle_file, satellite_altaz
+
+STATIONS_FILE = os.path.join(MODULE_DIR, '..', 'stations.txt')
+LAT, LON = 53.5511, 9.9937  # Hamburg
+
+
+@pytest.fixture(scope='module')
+def tles():
+    if not os.path.exists(STATIONS_FILE):
+        pytest.skip("needs stations.txt next to the Merai folder")
+    return read_tle_file(STATIONS_FILE)
+
+
+def _separation_arcsec(alt1, az1, alt2, az2):
+    a1, a2 = np.radians(alt1), np.radians(alt2)
+    cos_sep = np.sin(a1) * np.sin(a2) + np.cos(a1) * np.cos(a2) * np.cos(np.radians(az1 - az2))
+    return np.degrees(np.arccos(np.clip(cos_sep, -1, 1))) * 3600
+
+
+# One day from the TLE epochs in 5-minute steps, every satellite of the file at once
+def test_array_engine_matches_earth_satellite(tles):
+    propagator = build_propagator(tles)
+    ts = get_timescale()
+    t = ts.tt_jd(np.median(propagator['epoch_jd']) + np.arange(0, 1, 5 / 1440))
+    alt, az, distance = satellite_altaz(propagator, LAT, LON, t)
+    assert alt.shape == (len(tles), len(t))
+    topos = wgs84.latlon(LAT, LON)
+    for i, (name, line1, line2) in enumerate(tles):
+        ref_alt, ref_az, ref_distance = (EarthSatellite(line1, line2, name, ts) - topos).at(t).altaz()
+        assert _separation_arcsec(alt[i], az[i], ref_alt.degrees, ref_az.degrees).max() < 0.1, name
+        assert np.abs(distance[i] - ref_distance.km).max() < 1e-3, name
@@ -0,0 +1,73 @@
+# Local TLE store: text -> store -> sgp4init round trip, merging and change detection
+#
+#   python -m pytest test_tle_store.py
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import tle_store
+from astro_utils import get_timescale
+from paths import MODULE_DIR
+from satellite_utils import build_propagator, build_propagator_from_satrecs, read_tle_file, satellite_altaz
+
+STATIONS_FILE = os.path.join(MODULE_DIR, '..', 'stations.txt')
+
+
+@pytest.fixture
+def stations(tmp_path):
+    if not os.path.exists(STATIONS_FILE):
+        pytest.skip("needs stations.txt next to the Merai folder")
+    path = tmp_path / 'stations.txt'
+    shutil.copy(STATIONS_FILE, path)
+    return str(path)
+
+
+# The stored mean elements rebuilt with sgp4init must fly like the parsed TLE lines
+def test_store_round_trip(stations, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    tle_store.ingest_tle_files([stations], store_dir)
+    tle_store._stores.pop(store_dir)  # read back from disk, not from the in-process copy
+    elements = tle_store.load_elements(store_dir, refresh=False)
+    tles = sorted(read_tle_file(stations), key=lambda tle: int(tle[1][2:7]))
+    assert elements['norad'].tolist() == [int(line1[2:7]) for _, line1, _ in tles]
+    assert elements['name'].tolist() == [name for name, _, _ in tles]
+
+    stored = build_propagator_from_satrecs(elements['name'].tolist(), tle_store.satrecs_from_elements(elements))
+    parsed = build_propagator(tles)
+    t = get_timescale().tt_jd(np.median(parsed['epoch_jd']) + np.arange(0, 1, 10 / 1440))
+    alt1, az1, _ = satellite_altaz(stored, 53.55, 9.99, t)
+    alt2, az2, _ = satellite_altaz(parsed, 53.55, 9.99, t)
+    assert np.abs(alt1 - alt2).max() < 1e-4
+    assert np.abs((az1 - az2 + 180) % 360 - 180).max() < 1e-4
+
+
+def _records(norads, epochs, names):
+    records = np.zeros(len(norads), dtype=tle_store.TLE_DTYPE)
+    records['norad'], records['epoch_jd'], records['name'] = norads, epochs, names
+    return records
+
+
+def test_merge_keeps_newest_epoch_per_satellite():
+    old = _records([30, 10, 20], [2460000.0, 2460005.0, 2460001.0], ['C old', 'A new', 'B old'])
+    new = _records([20, 10, 40], [2460003.0, 2460002.0, 2460000.5], ['B new', 'A old', 'D'])
+    merged = tle_store._merge(old, new)
+    assert merged['norad'].tolist() == [10, 20, 30, 40]
+    assert merged['name'].tolist() == ['A new', 'B new', 'C old', 'D']
+    assert len(tle_store._merge()) == 0
+
+
+def test_unchanged_file_is_not_parsed_again(stations, tmp_path, monkeypatch):
+    store_dir = str(tmp_path / 'store')
+    parsed = []
+    records_from_file = tle_store._records_from_file
+    monkeypatch.setattr(tle_store, '_records_from_file', lambda path: parsed.append(path) or records_from_file(path))
+    first = tle_store.ingest_tle_files([stations], store_dir)
+    assert tle_store.ingest_tle_files([stations], store_dir) is first
+    assert len(parsed) == 1
+    # Same size, new mtime: parsed again
+    stat = os.stat(stations)
+    os.utime(stations, (stat.st_atime, stat.st_mtime + 10))
+    tle_store.ingest_tle_files([stations], store_dir)
+    assert len(parsed) == 2
@@ -0,0 +1,336 @@
+# Night timelapse: the sky chart of one site animated from sunset to sunrise
+#
+#   python timelapse_utils.py --lat 53.55 --lon 9.99 --date 2025-06-05 -o night.gif
+#   python timelapse_utils.py --start 2025-06-05T20:00 --hours 8 --projection rectangular -o night.mp4
+#
+# Positions for all frames come from one vectorized pass: stars from their apparent RA/Dec
+# of date plus the local sidereal time of every frame (the closed form almanac_utils uses),
+# the Sun, Moon and planets from the planet_utils tables, then a single projection_utils
+# call over the whole (frame, star) array. Frames are drawn by blitting: every process
+# renders the chart background once and per frame only restores it and moves the existing
+# artists (set_offsets, set_segments, set_position). Runs of frames are rendered and
+# encoded on a process pool and written to the output in order as they come back: GIF
+# frames (all on one palette, taken from the middle frame) straight into the file, other
+# extensions as raw RGB piped to ffmpeg.
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+from skyfield.api import Star
+
+from astro_utils import SOLAR_SYSTEM_BODIES, get_timescale, load_ephemeris
+from catalog_utils import load_catalog_arrays, magnitude_prefix
+from constellation_utils import load_constellation_segments, resolve_segments
+from profiling_utils import span
+from projection_utils import project, project_segments
+from visualization import (AZIMUTHAL_FIGSIZE, CLASS_STYLES, RECTANGULAR_FIGSIZE, draw_chart_axes, object_class,
+                           star_marker_sizes)
+
+TIMELAPSE_FRAMES = 120
+TIMELAPSE_FPS = 12
+TIMELAPSE_MAG_LIMIT = 4.5
+STAR_SIZE = 30
+# Loop forever (NETSCAPE2.0 application extension, loop count 0)
+GIF_LOOP = b'!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00'
+
+# Per-process chart: figure, canvas, blit background and the artists every frame moves
+_chart = {}
+
+
+# UTC sunset on `day` to the sunrise after it; where the Sun does not set or rise (polar
+# day or night) the 12 hours around local midnight
+def night_window(lat, lon, day):
+    from almanac_utils import body_almanac
+    sun = [body_almanac(lat, lon, day + timedelta(days=i)).set_index('name').loc['Sun'] for i in (0, 1)]
+    sunset = sun[0]['set']
+    rises = [row['rise'] for row in sun if not pd.isna(sunset) and not pd.isna(row['rise']) and row['rise'] > sunset]
+    if not rises:
+        midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(hours=24 - lon / 15.0)
+        return midnight - timedelta(hours=6), midnight + timedelta(hours=6)
+    return sunset.to_pydatetime(), rises[0].to_pydatetime()
+
+
+# Altitude and azimuth (degrees, float32 (n_times, n_rows)) of catalog rows `rows` at every
+# time of `times`. Apparent RA/Dec of date are computed once, for the middle of the span
+# (a star moves far less than an arcsecond in a night); each time only adds its sidereal time.
+def star_altaz_series(lat, lon, times, rows):
+    arrays = load_catalog_arrays()
+    star = Star(ra_hours=arrays['ra_hours'][rows], dec_degrees=arrays['dec_degrees'][rows],
+                ra_mas_per_year=arrays['ra_mas_per_year'][rows], dec_mas_per_year=arrays['dec_mas_per_year'][rows],
+                parallax_mas=arrays['parallax_mas'][rows], epoch=1721045.0 + arrays['epoch_year'][rows] * 365.25)
+    middle = get_timescale().tt_jd(times.tt[len(times.tt) // 2])
+    ra, dec, _ = load_ephemeris()['earth'].at(middle).observe(star).apparent().radec(epoch='date')
+    ha = np.radians((times.gast[:, None] + lon / 15.0 - ra.hours[None, :]) * 15.0)
+    phi, dec = np.radians(lat), dec.radians[None, :]
+    alt = np.degrees(np.arcsin(np.sin(phi) * np.sin(dec) + np.cos(phi) * np.cos(dec) * np.cos(ha)))
+    az = np.degrees(np.arctan2(-np.cos(dec) * np.sin(ha),
+                               np.sin(dec) * np.cos(phi) - np.cos(dec) * np.sin(phi) * np.cos(ha))) % 360.0
+    return alt.astype(np.float32), az.astype(np.float32)
+
+
+def _chart_xy(altitude, azimuth, projection):
+    x, y, visible = project(altitude, azimuth, projection)
+    return np.stack([np.where(visible, x, np.nan), np.where(visible, y, np.nan)], axis=-1).astype(np.float32)
+
+
+# Chart coordinates of everything drawn, for `frames` times evenly spaced from start to end
+# (datetimes): 'stars' (n_frames, n_stars, 2) for the catalog stars brighter than mag_limit
+# and 'bodies' (n_frames, n_bodies, 2), NaN where below the horizon or off the chart;
+# constellation lines 'lines' (n_segments, 2, 2) of all frames back to back, frame i
+# being lines[line_bounds[i]:line_bounds[i + 1]]. Plus the static styling of the artists.
+def timelapse_frames(lat, lon, start, end, frames=TIMELAPSE_FRAMES, mag_limit=TIMELAPSE_MAG_LIMIT,
+                     projection='stereographic', constellations=True):
+    from planet_utils import BODY_NAMES, planet_altaz_table
+    ts = get_timescale()
+    times = ts.tt_jd(np.linspace(ts.from_datetime(start).tt, ts.from_datetime(end).tt, frames))
+    arrays = load_catalog_arrays()
+    n_stars = magnitude_prefix(arrays, mag_limit)
+    rows = np.arange(n_stars)
+    endpoints = np.empty((0, 2), dtype=int)
+    segments = load_constellation_segments() if constellations else None
+    if segments is not None and len(segments['hip']):
+        # Constellation endpoints fainter than mag_limit are computed too, just not drawn
+        endpoints = resolve_segments(segments, arrays['hip'])
+        endpoints = endpoints[(endpoints >= 0).all(axis=1)]
+        rows = np.union1d(rows, endpoints.ravel())
+        endpoints = np.searchsorted(rows, endpoints)
+    alt, az = star_altaz_series(lat, lon, times, rows)
+    body_alt, body_az = planet_altaz_table(lat, lon, times)
+    bodies = [{'name': name, 'type': SOLAR_SYSTEM_BODIES[name][1]} for name in BODY_NAMES]
+    result = {
+        'labels': list(times.utc_strftime('%Y-%m-%d %H:%M UTC')),
+        'stars': _chart_xy(alt[:, :n_stars], az[:, :n_stars], projection),
+        'star_sizes': star_marker_sizes(arrays['magnitude'][:n_stars], STAR_SIZE),
+        'bodies': _chart_xy(body_alt.T, body_az.T, projection),
+        'body_names': list(BODY_NAMES),
+        'body_colors': [CLASS_STYLES[object_class(body)]['color'] for body in bodies],
+        'body_sizes': [CLASS_STYLES[object_class(body)]['size'] for body in bodies],
+        'lines': np.empty((0, 2, 2), dtype=np.float32),
+        'line_bounds': np.zeros(frames + 1, dtype=int),
+    }
+    if len(endpoints):
+        n_segments = len(endpoints)
+        lines, kept = project_segments(alt[:, endpoints].reshape(-1, 2), az[:, endpoints].reshape(-1, 2), projection)
+        result['lines'] = lines.astype(np.float32)
+        result['line_bounds'] = np.searchsorted(kept // n_segments, np.arange(frames + 1))
+    return result
+
+
+def _init_chart(projection, figsize, dpi, static, palette=None):
+    fig = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    draw_chart_axes(ax, projection)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    hidden = np.full(len(static['body_names']), np.nan)
+    lines = LineCollection([], colors='white', linewidths=0.6, alpha=0.35, zorder=2)
+    ax.add_collection(lines)
+    stars = ax.scatter(np.full(len(static['star_sizes']), np.nan), np.full(len(static['star_sizes']), np.nan),
+                       s=static['star_sizes'], color='white', edgecolor='none', zorder=3)
+    bodies = ax.scatter(hidden, hidden, s=static['body_sizes'], c=static['body_colors'], edgecolor='black',
+                        linewidths=0.5, zorder=3)
+    labels = [ax.text(0, 0, name, fontsize=8, ha='center', color=color, clip_on=True, zorder=4)
+              for name, color in zip(static['body_names'], static['body_colors'])]
+    clock = fig.text(0.98, 0.98, '', ha='right', va='top', fontsize=9)
+    _chart.update(canvas=canvas, ax=ax, background=background, lines=lines, stars=stars, bodies=bodies,
+                  labels=labels, clock=clock, palette=None if palette is None else _palette_image(palette))
+
+
+def _palette_image(colors):
+    image = Image.new('P', (1, 1))
+    image.putpalette(colors)
+    return image
+
+
+# RGB pixels (height, width, 3) of one frame, a view of the canvas valid until the next frame
+def _draw_frame(stars, bodies, lines, label):
+    canvas, ax = _chart['canvas'], _chart['ax']
+    canvas.restore_region(_chart['background'])
+    _chart['lines'].set_segments(lines)
+    _chart['stars'].set_offsets(stars)
+    _chart['bodies'].set_offsets(bodies)
+    for text, (x, y) in zip(_chart['labels'], bodies):
+        text.set_visible(bool(np.isfinite(x)))
+        text.set_position((x, y + 2))
+    _chart['clock'].set_text(label)
+    for artist in (_chart['lines'], _chart['stars'], _chart['bodies'], *_chart['labels'], _chart['clock']):
+        ax.draw_artist(artist)
+    return np.asarray(canvas.buffer_rgba())[..., :3]
+
+
+# One frame as a GIF file of its own, on the shared palette
+def _gif_file(rgb, duration):
+    buf = BytesIO()
+    Image.fromarray(rgb).quantize(palette=_chart['palette'], dither=Image.Dither.NONE) \
+        .save(buf, format='GIF', duration=duration, optimize=False)
+    return buf.getvalue()
+
+
+# Split a single-frame GIF into its header (signature, screen descriptor, global colour
+# table) and the frame itself (control extension, image descriptor, data), dropping the trailer
+def _split_gif(data):
+    flags = data[10]
+    header = 13 + (3 << ((flags & 7) + 1) if flags & 0x80 else 0)
+    return data[:header], data[header:-1]
+
+
+# Encoded frames of one chunk: GIF frame blocks, or raw RGB when duration is None
+def _render_chunk(chunk, duration=None):
+    encoded = []
+    for stars, bodies, lines, label in zip(chunk['stars'], chunk['bodies'], chunk['lines'], chunk['labels']):
+        rgb = _draw_frame(stars, bodies, lines, label)
+        encoded.append(rgb.tobytes() if duration is None else _split_gif(_gif_file(rgb, duration))[1])
+    return encoded
+
+
+def _init_worker(projection, figsize, dpi, static, palette):
+    _init_chart(projection, figsize, dpi, static, palette)
+
+
+def _chunks(data, chunk_size):
+    n_frames = len(data['labels'])
+    bounds = data['line_bounds']
+    for start in range(0, n_frames, chunk_size):
+        stop = min(start + chunk_size, n_frames)
+        yield {
+            'stars': data['stars'][start:stop],
+            'bodies': data['bodies'][start:stop],
+            'lines': [data['lines'][bounds[i]:bounds[i + 1]] for i in range(start, stop)],
+            'labels': data['labels'][start:stop],
+        }
+
+
+# Chunks rendered in order, at most max_pending of them in flight
+def _rendered(executor, chunks, duration, max_pending):
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_render_chunk, chunk, duration))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _ffmpeg(ffmpeg, path, size, fps):
+    width, height = size
+    return subprocess.Popen([ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                             '-s', f"{width}x{height}", '-r', str(fps), '-i', '-',
+                             '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', path],
+                            stdin=subprocess.PIPE)
+
+
+# Render the night sky of one site from start to end (datetimes, default: tonight's
+# night_window) as an animation in `out`, a path or a binary file. Paths ending in .gif and
+# file objects get a looping GIF, other paths a video through ffmpeg. workers > 1 renders
+# and encodes frames on that many processes. Returns the number of frames written.
+def render_timelapse(lat, lon, out, start=None, end=None, frames=TIMELAPSE_FRAMES, fps=TIMELAPSE_FPS,
+                     projection='stereographic', mag_limit=TIMELAPSE_MAG_LIMIT, constellations=True,
+                     figsize=None, dpi=100, workers=None):
+    if start is None or end is None:
+        start, end = night_window(lat, lon, datetime.now(timezone.utc).date())
+    if figsize is None:
+        figsize = RECTANGULAR_FIGSIZE if projection == 'rectangular' else AZIMUTHAL_FIGSIZE
+    workers = workers or os.cpu_count() or 1
+    gif = not isinstance(out, str) or out.lower().endswith('.gif')
+    ffmpeg = None if gif else shutil.which('ffmpeg')
+    if not gif and ffmpeg is None:
+        raise RuntimeError(f"Writing {os.path.splitext(out)[1]} needs ffmpeg on the PATH, write a .gif instead")
+    with span('timelapse_positions'):
+        data = timelapse_frames(lat, lon, start, end, frames, mag_limit, projection, constellations)
+    static = {name: data[name] for name in ('star_sizes', 'body_names', 'body_colors', 'body_sizes')}
+    with span('timelapse_render'):
+        # This process draws the middle frame once, for the GIF palette and the frame size
+        _init_chart(projection, figsize, dpi, static)
+        i, bounds = frames // 2, data['line_bounds']
+        rgb = _draw_frame(data['stars'][i], data['bodies'][i], data['lines'][bounds[i]:bounds[i + 1]],
+                          data['labels'][i])
+        height, width = rgb.shape[:2]
+        palette = None
+        duration = None
+        if gif:
+            palette = Image.fromarray(rgb).quantize(256).getpalette()
+            _chart['palette'] = _palette_image(palette)
+            duration = round(1000 / fps)
+            header = _split_gif(_gif_file(rgb, duration))[0]
+        chunk_size = max(1, -(-frames // (workers * 4)))
+        chunks = _chunks(data, chunk_size)
+        if isinstance(out, str):
+            sink = open(out, 'wb') if gif else _ffmpeg(ffmpeg, out, (width, height), fps)
+        else:
+            sink = out
+        write = sink.write if gif else sink.stdin.write
+        written = 0
+        try:
+            if gif:
+                write(header + GIF_LOOP)
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(projection, figsize, dpi, static, palette)) as executor:
+                    for encoded in _rendered(executor, chunks, duration, workers * 2):
+                        write(b''.join(encoded))
+                        written += len(encoded)
+            else:
+                for chunk in chunks:
+                    encoded = _render_chunk(chunk, duration)
+                    write(b''.join(encoded))
+                    written += len(encoded)
+            if gif:
+                write(b';')
+        finally:
+            if sink is not out:
+                if gif:
+                    sink.close()
+                else:
+                    sink.stdin.close()
+                    if sink.wait():
+                        raise RuntimeError(f"ffmpeg failed writing {out}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a night of sky motion as an animated GIF or video")
+    parser.add_argument('--lat', type=float, default=53.55)
+    parser.add_argument('--lon', type=float, default=9.99)
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help='UTC day whose sunset starts the night, YYYY-MM-DD (default today)')
+    parser.add_argument('--start', type=datetime.fromisoformat, default=None,
+                        help='ISO 8601 start instead of sunset, UTC when no offset is given')
+    parser.add_argument('--hours', type=float, default=10.0, help='length of the timelapse with --start')
+    parser.add_argument('--frames', type=int, default=TIMELAPSE_FRAMES)
+    parser.add_argument('--fps', type=int, default=TIMELAPSE_FPS)
+    parser.add_argument('--projection', choices=('rectangular', 'polar', 'stereographic', 'orthographic'),
+                        default='stereographic')
+    parser.add_argument('--mag-limit', type=float, default=TIMELAPSE_MAG_LIMIT)
+    parser.add_argument('--no-constellations', action='store_true')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('-o', '--output', default='night.gif', help='.gif, or any video extension ffmpeg knows')
+    args = parser.parse_args()
+    if args.start is not None:
+        start = args.start if args.start.tzinfo else args.start.replace(tzinfo=timezone.utc)
+        end = start + timedelta(hours=args.hours)
+    else:
+        start, end = night_window(args.lat, args.lon, args.date or datetime.now(timezone.utc).date())
+    started = time.perf_counter()
+    frames = render_timelapse(args.lat, args.lon, args.output, start, end, args.frames, args.fps, args.projection,
+                              args.mag_limit, not args.no_constellations, dpi=args.dpi, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"[INFO] {frames} frames, {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M} UTC, written to {args.output} "
+          f"in {elapsed:.2f}s ({frames / elapsed:.1f} frames/s, {args.workers} worker(s))")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# Local TLE store
+#
+#   python tle_store.py ingest ../stations.txt active.txt   # add or refresh element sets
+#   python tle_store.py info                                # counts, sources, staleness
+#
+# TLE text files are parsed once into a binary snapshot (cache/tle_store/elements.npy):
+# one record per NORAD id, sorted by id, holding the SGP4 mean elements themselves. Startup
+# reads that array and builds the propagator with sgp4init, so it neither parses TLE text
+# nor touches the network. A source file is re-parsed only when its size or mtime changed,
+# and a newer epoch always wins over an older one for the same satellite.
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+import time
+
+import numpy as np
+from sgp4.api import Satrec, WGS72
+
+from paths import CACHE_DIR, MODULE_DIR
+from satellite_utils import build_propagator_from_satrecs, read_tle_file
+
+TLE_STORE_DIR = os.path.join(CACHE_DIR, 'tle_store')
+# Files ingested when the store is first used; MERAI_TLE_FILES adds more (os.pathsep separated)
+DEFAULT_TLE_FILES = [os.path.normpath(os.path.join(MODULE_DIR, '..', 'stations.txt'))] + [
+    p for p in os.environ.get('MERAI_TLE_FILES', '').split(os.pathsep) if p]
+# Element sets older than this (relative to the time of use) get a warning
+STALE_AFTER_DAYS = float(os.environ.get('MERAI_TLE_STALE_DAYS', 7))
+SGP4_EPOCH_ZERO = 2433281.5  # JD of 1949 Dec 31 00:00 UT, sgp4init counts days from here
+TLE_DTYPE = np.dtype([
+    ('norad', 'i4'), ('name', 'U24'), ('epoch_jd', 'f8'),
+    ('bstar', 'f8'), ('ndot', 'f8'), ('nddot', 'f8'), ('ecco', 'f8'), ('argpo', 'f8'),
+    ('inclo', 'f8'), ('mo', 'f8'), ('no_kozai', 'f8'), ('nodeo', 'f8'),
+])
+
+_stores = {}
+_propagators = {}
+
+
+def _paths(store_dir):
+    return os.path.join(store_dir, 'elements.npy'), os.path.join(store_dir, 'sources.json')
+
+
+def _load_sources(store_dir):
+    try:
+        with open(_paths(store_dir)[1], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(store_dir, elements, sources):
+    os.makedirs(store_dir, exist_ok=True)
+    elements_path, sources_path = _paths(store_dir)
+    with open(elements_path + '.tmp', 'wb') as f:
+        np.save(f, elements)
+    os.replace(elements_path + '.tmp', elements_path)
+    with open(sources_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(sources, f, indent=1)
+    os.replace(sources_path + '.tmp', sources_path)
+
+
+# Store records for already initialised Satrec objects
+def elements_from_satrecs(names, satrecs):
+    records = np.empty(len(satrecs), dtype=TLE_DTYPE)
+    for i, (name, sat) in enumerate(zip(names, satrecs)):
+        records[i] = (sat.satnum, name[:24], sat.jdsatepoch + sat.jdsatepochF, sat.bstar, sat.ndot, sat.nddot,
+                      sat.ecco, sat.argpo, sat.inclo, sat.mo, sat.no_kozai, sat.nodeo)
+    return records
+
+
+def _records_from_file(path):
+    tles = read_tle_file(path)
+    return elements_from_satrecs([name for name, _, _ in tles],
+                                 [Satrec.twoline2rv(line1, line2, WGS72) for _, line1, line2 in tles])
+
+
+# Keep one record per NORAD id, the one with the latest epoch, sorted by id
+def _merge(*record_arrays):
+    records = np.concatenate(record_arrays) if record_arrays else np.empty(0, dtype=TLE_DTYPE)
+    order = np.lexsort((-records['epoch_jd'], records['norad']))
+    records = records[order]
+    first = np.ones(len(records), dtype=bool)
+    first[1:] = records['norad'][1:] != records['norad'][:-1]
+    return records[first]
+
+
+# Parse the given TLE files into the store, skipping files unchanged since the last ingest
+def ingest_tle_files(paths, store_dir=TLE_STORE_DIR):
+    elements = load_elements(store_dir, refresh=False)
+    sources = _load_sources(store_dir)
+    changed = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            print(f"[WARN] TLE file not found: {path}")
+            continue
+        stat = os.stat(path)
+        known = sources.get(path)
+        if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime:
+            continue
+        records = _records_from_file(path)
+        changed.append(records)
+        sources[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'count': len(records),
+                         'ingested': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        print(f"[INFO] Ingested {len(records)} element sets from {path}")
+    if changed:
+        elements = _merge(elements, *changed)
+        _save(store_dir, elements, sources)
+        _stores[store_dir] = elements
+        _propagators.pop(store_dir, None)
+    return elements
+
+
+# The stored element records (structured array sorted by NORAD id). With refresh=True the
+# default source files are checked first, which costs one stat() per file when nothing changed.
+def load_elements(store_dir=TLE_STORE_DIR, refresh=True):
+    if refresh:
+        return ingest_tle_files(DEFAULT_TLE_FILES, store_dir)
+    if store_dir not in _stores:
+        elements_path = _paths(store_dir)[0]
+        _stores[store_dir] = np.load(elements_path) if os.path.exists(elements_path) \
+            else np.empty(0, dtype=TLE_DTYPE)
+    return _stores[store_dir]
+
+
+# Records for the given NORAD ids (missing ids are skipped)
+def lookup(elements, norad_ids):
+    norad_ids = np.atleast_1d(norad_ids)
+    idx = np.clip(np.searchsorted(elements['norad'], norad_ids), 0, max(len(elements) - 1, 0))
+    found = elements['norad'][idx] == norad_ids if len(elements) else np.zeros(len(norad_ids), bool)
+    return elements[idx[found]]
+
+
+# Age in days of every element set at Julian date `jd` (default: now)
+def element_age_days(elements, jd=None):
+    if jd is None:
+        jd = time.time() / 86400.0 + 2440587.5
+    return jd - elements['epoch_jd']
+
+
+def warn_if_stale(elements, jd=None, max_age_days=STALE_AFTER_DAYS):
+    if not len(elements):
+        return 0
+    age = element_age_days(elements, jd)
+    stale = int((age > max_age_days).sum())
+    if stale:
+        print(f"[WARN] {stale} of {len(elements)} element sets are older than {max_age_days:g} days "
+              f"(oldest {age.max():.0f} days); positions drift by kilometres per day of age. "
+              f"Ingest fresher TLE files with 'python tle_store.py ingest'.")
+    return stale
+
+
+def satrecs_from_elements(elements):
+    satrecs = []
+    for rec in elements:
+        sat = Satrec()
+        sat.sgp4init(WGS72, 'i', int(rec['norad']), rec['epoch_jd'] - SGP4_EPOCH_ZERO, rec['bstar'], rec['ndot'],
+                     rec['nddot'], rec['ecco'], rec['argpo'], rec['inclo'], rec['mo'], rec['no_kozai'], rec['nodeo'])
+        satrecs.append(sat)
+    return satrecs
+
+
+# satellite_utils propagator for the whole store (or just norad_ids), cached per store
+def load_propagator(norad_ids=None, store_dir=TLE_STORE_DIR, refresh=True, jd=None):
+    elements = load_elements(store_dir, refresh)
+    if norad_ids is not None:
+        elements = lookup(elements, norad_ids)
+        return build_propagator_from_satrecs(elements['name'].tolist(), satrecs_from_elements(elements))
+    if store_dir not in _propagators:
+        warn_if_stale(elements, jd)
+        _propagators[store_dir] = build_propagator_from_satrecs(elements['name'].tolist(),
+                                                                satrecs_from_elements(elements))
+    return _propagators[store_dir]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local TLE store")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help='parse TLE files into the store')
+    ingest.add_argument('files', nargs='+')
+    sub.add_parser('info', help='show what the store holds')
+    args = parser.parse_args()
+    if args.command == 'ingest':
+        elements = ingest_tle_files(args.files)
+    else:
+        elements = load_elements(refresh=False)
+        for path, meta in _load_sources(TLE_STORE_DIR).items():
+            print(f"  {path}: {meta['count']} sets, ingested {meta['ingested']}")
+    print(f"[INFO] {len(elements)} satellites in {TLE_STORE_DIR}")
+    warn_if_stale(elements)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# Sky chart rendering
+# The chart background (axes, grid, horizon) is drawn once and blitted back for every
+# render, each object class is drawn with a single scatter call and the finished PNG is
+# cached on the visibility snapshot, so Streamlit reruns with the same sky cost nothing.
+# Given a site, the full-catalog star field and constellation lines go underneath as one
+# image reprojected from the pre-rendered tile pyramid (sky_tiles). The chart is the flat
+# altitude/azimuth plot or any azimuthal projection from projection_utils.
+from collections import OrderedDict
+import hashlib
+from io import BytesIO
+import threading
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+
+from projection_utils import chart_radius, project
+from wiki_utils import get_object_description
+
+# Drawing order and colour of each object class (same colours as the old per-object chart)
+CLASS_STYLES = {
+    'Sun': {'color': 'yellow', 'size': 120},
+    'Moon': {'color': 'gray', 'size': 100},
+    'Planet': {'color': 'red', 'size': 60},
+    'Star': {'color': 'white', 'size': 60, 'edgecolor': 'none'},
+    'Other': {'color': 'white', 'size': 40},
+}
+PNG_CACHE_SIZE = 32
+RECTANGULAR_FIGSIZE = (8, 4)
+AZIMUTHAL_FIGSIZE = (6, 6)
+CARDINALS = (('N', 0), ('E', 90), ('S', 180), ('W', 270))
+
+_backgrounds = {}
+_png_cache = OrderedDict()
+_render_lock = threading.Lock()
+
+
+def object_class(obj):
+    if obj['name'] in ('Sun', 'Moon'):
+        return obj['name']
+    if obj['type'] in ('Planet', 'Star'):
+        return obj['type']
+    return 'Other'
+
+
+def object_label(obj):
+    # Stars carry "Common Name: X | Name: HIP n" as their name, keep the chart readable
+    if obj['type'] == 'Star':
+        common = obj['name'].split('|')[0].replace('Common Name:', '').strip()
+        if common and common.lower() != 'none':
+            return common
+        return obj.get('raw_name', obj['name'])
+    return obj['name']
+
+
+def star_marker_sizes(magnitudes, base_size):
+    # Brighter stars (lower magnitude) get bigger markers, mag 6.5 ends up at a few px
+    mags = np.asarray(magnitudes, dtype=float)
+    sizes = base_size * np.power(10.0, -0.2 * (mags - 1.0))
+    return np.clip(sizes, 2.0, base_size * 2)
+
+
+def chart_snapshot_key(objects, figsize=(8, 4), dpi=100, max_labels=40, site=None, projection='rectangular'):
+    snapshot = [(o['name'], o['type'], o['altitude'], o['azimuth'], o.get('magnitude')) for o in objects]
+    return hashlib.sha1(repr((figsize, dpi, max_labels, site, projection, snapshot)).encode()).hexdigest()
+
+
+# Chart-coordinate extent of the sky area: the full azimuth/altitude rectangle, or the
+# square around the horizon circle
+def _chart_extent(projection):
+    radius = chart_radius(projection)
+    return (0, 360, 0, 90) if radius is None else (-radius, radius, -radius, radius)
+
+
+def _draw_azimuthal_frame(ax, projection):
+    radius = chart_radius(projection)
+    ring_az = np.linspace(0, 360, 361)
+    ax.set_xlim(-1.12 * radius, 1.12 * radius)
+    ax.set_ylim(-1.12 * radius, 1.12 * radius)
+    ax.set_aspect('equal')
+    ax.set_axis_off()
+    x, y, _ = project(np.zeros_like(ring_az), ring_az, projection)
+    ax.fill(x, y, color='navy', zorder=0)
+    ax.plot(x, y, color='darkgreen', linewidth=3, zorder=2)
+    for altitude in (30, 60):
+        x, y, _ = project(np.full_like(ring_az, altitude), ring_az, projection)
+        ax.plot(x, y, color='white', alpha=0.2, linewidth=0.8)
+    for azimuth in range(0, 360, 45):
+        x, y, _ = project(np.array([0.0, 90.0]), np.array([azimuth, azimuth]), projection)
+        ax.plot(x, y, color='white', alpha=0.2, linewidth=0.8)
+    for label, azimuth in CARDINALS:
+        x, y, _ = project(0.0, azimuth, projection)
+        ax.text(1.06 * x, 1.06 * y, label, ha='center', va='center', fontsize=10)
+    ax.set_title(f"Sky Chart: {projection.capitalize()} Projection")
+
+
+# Static part of a chart (limits, grid, horizon, labels) on an empty axes; shared with the
+# timelapse renderer, which blits it back for every frame as well
+def draw_chart_axes(ax, projection='rectangular'):
+    if projection == 'rectangular':
+        ax.set_xlim(0, 360)
+        ax.set_ylim(0, 90)
+        ax.set_xlabel('Azimuth (°)')
+        ax.set_ylabel('Altitude (°)')
+        ax.set_title('Sky Chart: Altitude vs Azimuth')
+        ax.set_facecolor('navy')
+        ax.grid(True, color='white', alpha=0.2)
+        ax.axhline(0, color='darkgreen', linewidth=3)
+    else:
+        _draw_azimuthal_frame(ax, projection)
+    ax.set_autoscale_on(False)
+
+
+def _get_background(figsize, dpi, projection='rectangular'):
+    key = (tuple(figsize), dpi, projection)
+    if key not in _backgrounds:
+        fig = Figure(figsize=figsize, dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        draw_chart_axes(ax, projection)
+        canvas.draw()
+        _backgrounds[key] = (fig, ax, canvas, canvas.copy_from_bbox(fig.bbox))
+    return _backgrounds[key]
+
+
+def _draw_objects(ax, objects, max_labels, projection='rectangular'):
+    groups = {}
+    for obj in objects:
+        groups.setdefault(object_class(obj), []).append(obj)
+    artists = []
+    handles = []
+    for cls, style in CLASS_STYLES.items():
+        members = groups.get(cls)
+        if not members:
+            continue
+        az = np.fromiter((o['azimuth'] for o in members), dtype=float, count=len(members))
+        alt = np.fromiter((o['altitude'] for o in members), dtype=float, count=len(members))
+        x, y, _ = project(alt, az, projection, clip_horizon=False)
+        sizes = style['size']
+        if cls == 'Star' and all('magnitude' in o for o in members):
+            sizes = star_marker_sizes([o['magnitude'] for o in members], style['size'])
+        scatter = ax.scatter(x, y, s=sizes, color=style['color'], edgecolor=style.get('edgecolor', 'black'),
+                             linewidths=0.5, label=cls, zorder=3)
+        artists.append(scatter)
+        handles.append(scatter)
+    # Label every non-star object, stars only up to max_labels (highest first)
+    stars_labelled = 0
+    ordered = sorted(objects, key=lambda x: -x['altitude'])
+    x, y, _ = project([o['altitude'] for o in ordered], [o['azimuth'] for o in ordered], projection,
+                      clip_horizon=False)
+    for obj, label_x, label_y in zip(ordered, x, y):
+        cls = object_class(obj)
+        if cls == 'Star':
+            if stars_labelled >= max_labels:
+                continue
+            stars_labelled += 1
+        artists.append(ax.text(label_x, label_y + 2, object_label(obj), fontsize=8,
+                               ha='center', color=CLASS_STYLES[cls]['color'], clip_on=True, zorder=4))
+    if handles:
+        artists.append(ax.legend(handles=handles, loc='lower left', fontsize=7))
+    return artists
+
+
+# Star field for site = (lat, lon, datetime) at the resolution of the plot area
+def _draw_star_field(ax, site, projection='rectangular'):
+    from astro_utils import get_timescale
+    from sky_tiles import horizon_star_field
+    lat, lon, when = site
+    extent = _chart_extent(projection)
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    width = max(1, int(round((extent[1] - extent[0]) * ax.bbox.width / (x1 - x0))))
+    height = max(1, int(round((extent[3] - extent[2]) * ax.bbox.height / (y1 - y0))))
+    field = horizon_star_field(lat, lon, get_timescale().from_datetime(when), width, height, projection, extent)
+    return ax.imshow(field, extent=extent, aspect=ax.get_aspect(), interpolation='nearest', zorder=1)
+
+
+def _encode_png(canvas):
+    width, height = canvas.get_width_height()
+    img = Image.frombuffer('RGBA', (width, height), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+    buf = BytesIO()
+    img.save(buf, format='PNG', compress_level=1)
+    return buf.getvalue()
+
+
+# Render the sky chart for a list of visible objects and return PNG bytes: altitude vs
+# azimuth, or a zenith-centred 'polar'/'stereographic'/'orthographic' chart.
+# site=(lat, lon, datetime) adds the star field of that sky behind the objects.
+def render_sky_chart(objects, figsize=None, dpi=100, max_labels=40, site=None, projection='rectangular'):
+    if figsize is None:
+        figsize = RECTANGULAR_FIGSIZE if projection == 'rectangular' else AZIMUTHAL_FIGSIZE
+    key = chart_snapshot_key(objects, figsize, dpi, max_labels, site, projection)
+    with _render_lock:
+        png = _png_cache.get(key)
+        if png is not None:
+            _png_cache.move_to_end(key)
+            return png
+        fig, ax, canvas, background = _get_background(figsize, dpi, projection)
+        canvas.restore_region(background)
+        artists = _draw_objects(ax, objects, max_labels, projection)
+        if site is not None:
+            artists.insert(0, _draw_star_field(ax, site, projection))
+        try:
+            for artist in artists:
+                ax.draw_artist(artist)
+            png = _encode_png(canvas)
+        finally:
+            for artist in artists:
+                artist.remove()
+        _png_cache[key] = png
+        while len(_png_cache) > PNG_CACHE_SIZE:
+            _png_cache.popitem(last=False)
+        return png
+
+
+def clear_chart_cache():
+    with _render_lock:
+        _png_cache.clear()
+        _backgrounds.clear()
+
+
+# Show an object's Wikipedia description and image in a matplotlib window (terminal use)
+def display_image(image_url, title, wiki_name=None):
+    import matplotlib.pyplot as plt
+    import requests
+    if wiki_name is None:
+        wiki_name = title
+    desc = get_object_description(wiki_name)
+    print(f"Description for {title}:\n{desc}\n" if desc else f"No description found for {title}.")
+    if not image_url:
+        print(f"No image found for {title}.")
+        return
+    try:
+        resp = requests.get(image_url, timeout=5)
+        if resp.status_code == 200:
+            img = Image.open(BytesIO(resp.content))
+            plt.imshow(img)
+            plt.axis('off')
+            plt.title(title)
+            plt.show()
+        else:
+            print(f"Could not retrieve image for {title}.")
+    except Exception:
+        print(f"Could not retrieve image for {title}.")
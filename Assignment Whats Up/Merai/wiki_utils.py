@@ -0,0 +1,43 @@
+# Wikipedia API helpers
+# requests is imported on first use and kept in _requests, so importing this module (and
+# the astronomy core that depends on it) stays cheap for scripts that never go online.
+import html
+
+WIKI_SUMMARY_URL = "https://en.wikipedia.org/api/rest_v1/page/summary/{}"
+
+_requests = None
+
+
+def _http():
+    global _requests
+    if _requests is None:
+        import requests
+        _requests = requests
+    return _requests
+
+
+def get_object_image_url(name):
+    url = WIKI_SUMMARY_URL.format(name)
+    try:
+        resp = _http().get(url, timeout=5)
+        if resp.status_code == 200:
+            data = resp.json()
+            if 'thumbnail' in data and 'source' in data['thumbnail']:
+                return data['thumbnail']['source']
+    except Exception:
+        pass
+    return None
+
+
+# Readable description from the Wikipedia summary API
+def get_object_description(name):
+    url = WIKI_SUMMARY_URL.format(name)
+    try:
+        resp = _http().get(url, timeout=5)
+        if resp.status_code == 200:
+            data = resp.json()
+            if 'extract' in data:
+                return html.unescape(data['extract'])
+    except Exception:
+        pass
+    return None
@@ -9,14 +9,18 @@ import re
 import base64
 import astropy.units as u
 
+# Shared location lookup (cached, works offline) lives next to the Merai app
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Merai'))
+from location_utils import resolve_place
+
 #GETTING LOCATION
 #Using geocoder to get the location of the user based on their IP address
 #This is a simple way to get the location without needing user input
 def get_location():
     try:
-        g = geocoder.geonames('Hamburg')
-        if g.ok:
-            lat, lon = g.latlng
+        location = resolve_place('Hamburg')
+        if location:
+            lat, lon, _ = location
             return lat, lon
         else:
             print("Could not detect location.")